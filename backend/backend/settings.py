@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     'django.contrib.gis',
+    'django.contrib.postgres',
     'django_filters',
     "rest_framework",
     "rest_framework.authtoken",
@@ -149,6 +150,72 @@ PHONENUMBER_DEFAULT_REGION = 'RU'
 
 API_KEY = os.getenv('API_KEY', default='key')
 
+# Геокодирование: провайдер и кеш результатов
+GEOCODER_PROVIDER = os.getenv(
+    'GEOCODER_PROVIDER', default='events.geocoding.YandexGeocoder'
+)
+GEOCODING_CACHE_SIZE = int(os.getenv('GEOCODING_CACHE_SIZE', default=1024))
+GEOCODING_CACHE_TTL = int(
+    os.getenv('GEOCODING_CACHE_TTL', default=30 * 24 * 60 * 60)
+)
+GEOCODING_COORD_PRECISION = int(
+    os.getenv('GEOCODING_COORD_PRECISION', default=4)
+)
+# Отложенное геокодирование воркером geocode_worker
+GEOCODING_ASYNC = bool(os.getenv('GEOCODING_ASYNC') == 'True')
+GEOCODING_MAX_ATTEMPTS = int(os.getenv('GEOCODING_MAX_ATTEMPTS', default=5))
+GEOCODING_RETRY_DELAY = int(os.getenv('GEOCODING_RETRY_DELAY', default=60))
+
+# Радиус (м), в котором новая локация считается совпадающей с существующей
+LOCATION_MATCH_RADIUS = float(os.getenv('LOCATION_MATCH_RADIUS', default=25))
+
+# Маршруты: каталог графа улиц, построенного командой build_street_graph,
+# и скорости передвижения (км/ч)
+ROUTING_GRAPH_DIR = os.getenv(
+    'ROUTING_GRAPH_DIR', default=os.path.join(BASE_DIR, 'data', 'graph')
+)
+ROUTING_SPEEDS = {
+    'walk': 5,
+    'bike': 15,
+}
+# Ограничения поиска по времени в пути: максимальное время (мин),
+# число узлов графа на запрос и число мероприятий-кандидатов
+ROUTING_MAX_TRAVEL_TIME = int(
+    os.getenv('ROUTING_MAX_TRAVEL_TIME', default=60)
+)
+ROUTING_MAX_SETTLED_NODES = int(
+    os.getenv('ROUTING_MAX_SETTLED_NODES', default=300000)
+)
+ROUTING_MAX_CANDIDATES = int(
+    os.getenv('ROUTING_MAX_CANDIDATES', default=500)
+)
+# Изохроны: размер ячейки области (градусы), точность округления
+# исходной точки для кеша и время жизни кеша (с)
+ISOCHRONE_CELL = 0.002
+ISOCHRONE_ORIGIN_PRECISION = 3
+ISOCHRONE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Количество последних комментариев в превью мероприятия (0 - без превью)
+COMMENTS_PREVIEW_SIZE = int(os.getenv('COMMENTS_PREVIEW_SIZE', default=3))
+
+# Кеш: по умолчанию в памяти процесса, в продакшене - общий бэкенд,
+# например django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+# Время жизни (с) закешированных ответов списка и карточки мероприятия
+# для анонимных пользователей
+EVENTS_CACHE_TIMEOUT = int(os.getenv('EVENTS_CACHE_TIMEOUT', default=60))
+
+# Время жизни (с) каталога видов активности в памяти воркера
+ACTIVITY_CATALOG_TTL = int(os.getenv('ACTIVITY_CATALOG_TTL', default=300))
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
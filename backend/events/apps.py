@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class EventsConfig(AppConfig):
     default_auto_field = "django.db.models.AutoField"
     name = "events"
+
+    def ready(self):
+        from . import signals  # noqa: F401
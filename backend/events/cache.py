@@ -0,0 +1,146 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from rest_framework.response import Response
+
+# Версия всех ответов списка мероприятий
+LIST_VERSION_KEY = 'events:version:list'
+# Версия, сбрасывающая все закешированные мероприятия разом
+ALL_VERSION_KEY = 'events:version:all'
+EVENT_VERSION_KEY = 'events:version:event:{}'
+STATS_KEY = 'events:cache:{}'
+
+# Параметры пагинации, от которых зависит ответ помимо полей EventFilter
+PAGINATION_PARAMS = ('page', 'cursor', 'pagination')
+
+
+def initial_version():
+    """Начальная версия ключа - текущее время в миллисекундах,
+    чтобы после вытеснения ключа из кеша не вернуться к старой версии
+    и не отдать устаревшие ответы."""
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_version(), None)
+        version = cache.get(key, initial_version())
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, initial_version(), None)
+
+
+def bump_versions(event_ids):
+    if event_ids is not None and not event_ids:
+        return
+    bump_version(LIST_VERSION_KEY)
+    if event_ids is None:
+        bump_version(ALL_VERSION_KEY)
+        return
+    for event_id in set(event_ids):
+        bump_version(EVENT_VERSION_KEY.format(event_id))
+
+
+def invalidate_events(event_ids=None):
+    """Сбрасывает закешированные ответы для мероприятий `event_ids`
+    (None - для всех) и для всех страниц списка.
+
+    Версии повышаются после фиксации транзакции, чтобы параллельный
+    запрос не закешировал незафиксированное состояние с новой версией."""
+    if event_ids is not None:
+        event_ids = list(event_ids)
+        if not event_ids:
+            return
+    transaction.on_commit(partial(bump_versions, event_ids))
+
+
+def normalize_params(query_params, names):
+    """Параметры запроса из `names` без пустых значений,
+    отсортированные по имени и значению."""
+    params = []
+    for name in sorted(names):
+        values = sorted(
+            value.strip() for value in query_params.getlist(name)
+            if value.strip()
+        )
+        if values:
+            params.append((name, values))
+    return params
+
+
+def get_versions(event_id=None):
+    """Версии списка мероприятий или мероприятия `event_id`
+    для ключа кеша и ETag.
+
+    К версиям добавляется номер интервала EVENTS_CACHE_TIMEOUT:
+    ответы зависят от текущего времени (is_actual_event). Кеш
+    в памяти процесса не видит изменений из других процессов,
+    поэтому ETag для пользователей строится еще и по last_modified
+    из БД (см. EventViewSet.list)."""
+    if event_id is None:
+        versions = [get_version(LIST_VERSION_KEY)]
+    else:
+        versions = [get_version(ALL_VERSION_KEY),
+                    get_version(EVENT_VERSION_KEY.format(event_id))]
+    versions.append(
+        int(time.time() // max(settings.EVENTS_CACHE_TIMEOUT, 1))
+    )
+    return versions
+
+
+def get_cache_key(request, names, versions):
+    """Ключ ответа: версии и хеш нормализованных параметров запроса."""
+    params = normalize_params(request.query_params,
+                              list(names) + list(PAGINATION_PARAMS))
+    digest = hashlib.md5(repr(
+        (request.get_host(), request.path, params)
+    ).encode('utf-8')).hexdigest()
+    return 'events:response:{}:{}'.format(
+        ':'.join(map(str, versions)), digest
+    )
+
+
+def count(name):
+    key = STATS_KEY.format(name)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_cache_stats():
+    """Количество попаданий и промахов кеша ответов."""
+    hits = cache.get(STATS_KEY.format('hits'), 0)
+    misses = cache.get(STATS_KEY.format('misses'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None
+    }
+
+
+def cached_response(key, render):
+    """Возвращает закешированный ответ по ключу или строит его
+    функцией `render` и кеширует, если он успешен."""
+    data = cache.get(key)
+    if data is not None:
+        count('hits')
+        return Response(data)
+    count('misses')
+    response = render()
+    if response.status_code == 200:
+        cache.set(key, response.data, settings.EVENTS_CACHE_TIMEOUT)
+    return response
@@ -0,0 +1,85 @@
+import bisect
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_version, get_version
+from .models import Activity
+
+# Версия каталога в кеше, повышается при изменении Activity
+VERSION_KEY = 'activities:version'
+
+
+def normalize_name(name):
+    """Ключ поиска: без учета регистра, 'ё' равна 'е'."""
+    return name.casefold().replace('ё', 'е')
+
+
+class ActivityCatalog:
+    """Снимок таблицы видов активности с индексом по префиксу названия."""
+
+    def __init__(self, activities, version):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_id = {activity.pk: activity for activity in activities}
+        self.by_name = {activity.name: activity for activity in activities}
+        self.index = sorted(
+            (normalize_name(activity.name), activity.name, activity.pk)
+            for activity in activities
+        )
+        self.keys = [key for key, _, _ in self.index]
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def names(self):
+        return sorted(self.by_name)
+
+    def ids_for_names(self, names):
+        return [self.by_name[name].pk for name in names
+                if name in self.by_name]
+
+    def search(self, prefix=''):
+        """Виды активности, название которых начинается с `prefix`,
+        в порядке названия."""
+        prefix = normalize_name(prefix)
+        start = bisect.bisect_left(self.keys, prefix)
+        found = []
+        for key, name, pk in self.index[start:]:
+            if not key.startswith(prefix):
+                break
+            found.append(self.by_id[pk])
+        return sorted(found, key=lambda activity: activity.name)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Возвращает каталог видов активности процесса.
+
+    Каталог перезагружается, если версия в кеше изменилась или снимок
+    старше settings.ACTIVITY_CATALOG_TTL секунд - это ограничивает
+    устаревание при кеше в памяти процесса, не общем для воркеров."""
+    global _catalog
+    version = get_version(VERSION_KEY)
+    with _catalog_lock:
+        if (_catalog is None
+                or _catalog.version != version
+                or time.monotonic() - _catalog.loaded_at
+                > settings.ACTIVITY_CATALOG_TTL):
+            _catalog = ActivityCatalog(list(Activity.objects.all()), version)
+        return _catalog
+
+
+def invalidate_catalog():
+    """Повышает версию каталога после фиксации транзакции."""
+    transaction.on_commit(partial(bump_version, VERSION_KEY))
+
+
+def activity_choices():
+    return [(name, name) for name in get_catalog().names()]
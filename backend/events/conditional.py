@@ -0,0 +1,57 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+
+def get_last_modified(queryset, **lookups):
+    """Время последнего изменения объекта, найденного по `lookups`
+    (по первичному ключу), или всей таблицы без `lookups` - одним
+    запросом по индексу last_modified.
+
+    Для некорректных значений фильтра или отсутствующего объекта
+    возвращает None, чтобы ответ построил обычный путь запроса."""
+    try:
+        return queryset.filter(**lookups).order_by().aggregate(
+            last_modified=Max('last_modified')
+        )['last_modified']
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def get_etag(request, versions, last_modified):
+    """Сильный ETag: ответы различаются для пользователей и параметров
+    запроса, поэтому они входят в хеш вместе с валидаторами."""
+    digest = hashlib.md5(repr((
+        request.user.pk,
+        request.get_full_path(),
+        versions,
+        last_modified.isoformat() if last_modified else None
+    )).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional_response(request, render, versions=None, last_modified=None):
+    """Отвечает 304, если ресурс не изменился с версии клиента,
+    иначе строит ответ функцией `render`.
+
+    ETag строится по версиям кеша `versions` (events.cache) и времени
+    изменения `last_modified`, Last-Modified - по `last_modified`.
+    Без валидаторов ответ строится как обычно."""
+    if versions is None and last_modified is None:
+        return render()
+    etag = get_etag(request, versions, last_modified)
+    timestamp = (int(last_modified.timestamp())
+                 if last_modified is not None else None)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = render()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
@@ -0,0 +1,259 @@
+import heapq
+import math
+from pathlib import Path
+
+import numpy as np
+
+HIERARCHY_ARRAYS = ('ch_rank',
+                    'ch_up_indptr',
+                    'ch_up_indices',
+                    'ch_up_weights',
+                    'ch_up_middle',
+                    'ch_down_indptr',
+                    'ch_down_indices',
+                    'ch_down_weights',
+                    'ch_down_middle')
+
+# Ограничение числа узлов в поиске свидетеля при сжатии узла
+WITNESS_LIMIT = 60
+
+
+def witness_distances(outgoing, source, excluded, limit):
+    """Расстояния от `source` в оставшемся графе в обход узла `excluded`,
+    не дальше `limit` и не более WITNESS_LIMIT обработанных узлов."""
+    distances = {source: 0.0}
+    queue = [(0.0, source)]
+    settled = 0
+    while queue and settled < WITNESS_LIMIT:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]:
+            continue
+        if distance > limit:
+            break
+        settled += 1
+        for neighbor, (weight, _) in outgoing[node].items():
+            if neighbor == excluded:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                heapq.heappush(queue, (candidate, neighbor))
+    return distances
+
+
+def shortcuts_for(outgoing, incoming, node):
+    """Шорткаты, необходимые при сжатии узла: [(u, w, длина)]."""
+    shortcuts = []
+    if not outgoing[node]:
+        return shortcuts
+    longest_out = max(weight for weight, _ in outgoing[node].values())
+    for source, (weight_in, _) in incoming[node].items():
+        distances = witness_distances(outgoing, source, node,
+                                      weight_in + longest_out)
+        for target, (weight_out, _) in outgoing[node].items():
+            if source == target:
+                continue
+            length = weight_in + weight_out
+            if distances.get(target, math.inf) > length:
+                shortcuts.append((source, target, length))
+    return shortcuts
+
+
+def to_csr(rows, size):
+    """Собирает список строк [(узел, вес, середина)] в CSR-массивы."""
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=indptr[1:])
+    edges = [edge for row in rows for edge in row]
+    return (indptr,
+            np.array([edge[0] for edge in edges], dtype=np.int32),
+            np.array([edge[1] for edge in edges], dtype=np.float32),
+            np.array([edge[2] for edge in edges], dtype=np.int32))
+
+
+def build_contraction_hierarchy(indptr, indices, weights, progress=None):
+    """Строит иерархию сжатия (contraction hierarchy) графа в формате CSR.
+
+    Узлы сжимаются в порядке разности ребер с ленивым пересчетом
+    приоритета. Возвращает словарь массивов HIERARCHY_ARRAYS:
+    ранг узлов и восходящие графы для прямого и обратного поиска,
+    у каждого ребра - середина шортката или -1."""
+    size = len(indptr) - 1
+    outgoing = [{} for _ in range(size)]
+    incoming = [{} for _ in range(size)]
+    for node in range(size):
+        for position in range(indptr[node], indptr[node + 1]):
+            target, weight = int(indices[position]), float(weights[position])
+            if target != node and weight < outgoing[node].get(
+                    target, (math.inf, -1))[0]:
+                outgoing[node][target] = (weight, -1)
+                incoming[target][node] = (weight, -1)
+
+    contracted_neighbors = [0] * size
+
+    def priority(node):
+        return (len(shortcuts_for(outgoing, incoming, node))
+                - len(outgoing[node]) - len(incoming[node])
+                + contracted_neighbors[node])
+
+    queue = [(priority(node), node) for node in range(size)]
+    heapq.heapify(queue)
+    rank = np.full(size, -1, dtype=np.int32)
+    up = [[] for _ in range(size)]
+    down = [[] for _ in range(size)]
+    current = 0
+    while queue:
+        _, node = heapq.heappop(queue)
+        if rank[node] >= 0:
+            continue
+        updated = priority(node)
+        if queue and updated > queue[0][0]:
+            heapq.heappush(queue, (updated, node))
+            continue
+
+        for source, target, length in shortcuts_for(outgoing, incoming, node):
+            if length < outgoing[source].get(target, (math.inf, -1))[0]:
+                outgoing[source][target] = (length, node)
+                incoming[target][source] = (length, node)
+
+        for target, (weight, middle) in outgoing[node].items():
+            up[node].append((target, weight, middle))
+            del incoming[target][node]
+            contracted_neighbors[target] += 1
+        for source, (weight, middle) in incoming[node].items():
+            down[node].append((source, weight, middle))
+            del outgoing[source][node]
+            contracted_neighbors[source] += 1
+        outgoing[node] = {}
+        incoming[node] = {}
+
+        rank[node] = current
+        current += 1
+        if progress is not None and current % 10000 == 0:
+            progress(current, size)
+
+    up_arrays = to_csr(up, size)
+    down_arrays = to_csr(down, size)
+    return dict(zip(HIERARCHY_ARRAYS, (rank,) + up_arrays + down_arrays))
+
+
+def save_contraction_hierarchy(path, arrays):
+    """Сохраняет массивы иерархии в каталог графа улиц."""
+    for name, array in arrays.items():
+        np.save(Path(path) / f'{name}.npy', array)
+
+
+class ContractionHierarchy:
+    """Иерархия сжатия, отображенная в память, с двунаправленным
+    поиском по восходящим графам."""
+
+    def __init__(self, path):
+        for name in HIERARCHY_ARRAYS:
+            setattr(self, name[3:], np.load(Path(path) / f'{name}.npy',
+                                            mmap_mode='r'))
+
+    @classmethod
+    def load(cls, path):
+        """Загружает иерархию, если она построена, иначе None."""
+        if not all((Path(path) / f'{name}.npy').exists()
+                   for name in HIERARCHY_ARRAYS):
+            return None
+        return cls(path)
+
+    @staticmethod
+    def edges(indptr, indices, weights, node):
+        start, end = indptr[node], indptr[node + 1]
+        return zip(indices[start:end].tolist(), weights[start:end].tolist())
+
+    def search_step(self, queue, distances, parents, settled, other,
+                    graph, best):
+        distance, node = heapq.heappop(queue)
+        if node in settled:
+            return best
+        settled.add(node)
+        if node in other:
+            best = min(best, (distance + other[node], node))
+        for neighbor, weight in self.edges(*graph, node):
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                parents[neighbor] = node
+                heapq.heappush(queue, (candidate, neighbor))
+        return best
+
+    def route(self, source, target):
+        """Кратчайший путь source -> target.
+
+        Возвращает (длина в метрах, список узлов исходного графа)
+        или None, если пути нет."""
+        up = (self.up_indptr, self.up_indices, self.up_weights)
+        down = (self.down_indptr, self.down_indices, self.down_weights)
+        forward, backward = {source: 0.0}, {target: 0.0}
+        forward_parents, backward_parents = {source: None}, {target: None}
+        forward_settled, backward_settled = set(), set()
+        forward_queue, backward_queue = [(0.0, source)], [(0.0, target)]
+        best = (math.inf, None)
+        if source == target:
+            best = (0.0, source)
+
+        while forward_queue or backward_queue:
+            forward_min = forward_queue[0][0] if forward_queue else math.inf
+            backward_min = (backward_queue[0][0] if backward_queue
+                            else math.inf)
+            if min(forward_min, backward_min) >= best[0]:
+                break
+            if forward_min <= backward_min:
+                best = self.search_step(forward_queue, forward,
+                                        forward_parents, forward_settled,
+                                        backward, up, best)
+            else:
+                best = self.search_step(backward_queue, backward,
+                                        backward_parents, backward_settled,
+                                        forward, down, best)
+
+        distance, meeting = best
+        if meeting is None:
+            return None
+        path = []
+        node = meeting
+        while node is not None:
+            path.append(node)
+            node = forward_parents[node]
+        path.reverse()
+        node = backward_parents[meeting]
+        while node is not None:
+            path.append(node)
+            node = backward_parents[node]
+        return distance, self.unpack(path)
+
+    def middle(self, source, target):
+        """Середина ребра source -> target иерархии или -1."""
+        if self.rank[source] < self.rank[target]:
+            indptr, indices, middles = (self.up_indptr,
+                                        self.up_indices,
+                                        self.up_middle)
+            node, neighbor = source, target
+        else:
+            indptr, indices, middles = (self.down_indptr,
+                                        self.down_indices,
+                                        self.down_middle)
+            node, neighbor = target, source
+        start, end = indptr[node], indptr[node + 1]
+        position = start + int(np.flatnonzero(
+            indices[start:end] == neighbor
+        )[0])
+        return int(middles[position])
+
+    def unpack(self, path):
+        """Раскрывает шорткаты пути в узлы исходного графа."""
+        result = [path[0]]
+        stack = [(path[i], path[i + 1]) for i in range(len(path) - 1)]
+        stack.reverse()
+        while stack:
+            source, target = stack.pop()
+            middle = self.middle(source, target)
+            if middle < 0:
+                result.append(target)
+            else:
+                stack.append((middle, target))
+                stack.append((source, middle))
+        return result
@@ -0,0 +1,68 @@
+from django.apps import apps
+from django.db import connection
+
+# Счетчики, поддерживаемые триггерами БД (миграции events 0009
+# и users 0002): (модель со счетчиком, поле счетчика,
+# модель связи, поле связи со ссылкой на объект)
+COUNTERS = (
+    ('events.Event', 'participants_count', 'events.Participation', 'event'),
+    ('events.Comment', 'likes_count', 'events.Like', 'comment'),
+    ('users.CustomUser', 'subscribers_count', 'users.Subscribe', 'author'),
+)
+
+
+class CounterFieldsMixin:
+    """Не записывает счетчики `counter_fields` при обычном save().
+
+    Значения счетчиков поддерживают триггеры БД, а экземпляр хранит
+    прочитанные при загрузке: без этого сохранение объекта затирало бы
+    лайки, участия и подписки, зафиксированные после его чтения."""
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+RECONCILE_SQL = '''
+    UPDATE {table} AS target
+    SET {column} = actual.count
+    FROM (
+        SELECT counted.id, COUNT(relation.id) AS count
+        FROM {table} AS counted
+        LEFT JOIN {relation_table} AS relation
+            ON relation.{fk_column} = counted.id
+        GROUP BY counted.id
+    ) AS actual
+    WHERE target.id = actual.id AND target.{column} <> actual.count
+'''
+
+
+def reconcile_counters():
+    """Пересчитывает хранимые счетчики по таблицам связей.
+
+    Возвращает словарь {'Модель.поле': количество исправленных строк}."""
+    fixed = {}
+    with connection.cursor() as cursor:
+        for label, column, relation_label, field in COUNTERS:
+            model = apps.get_model(label)
+            relation = apps.get_model(relation_label)
+            cursor.execute(RECONCILE_SQL.format(
+                table=connection.ops.quote_name(model._meta.db_table),
+                column=connection.ops.quote_name(column),
+                relation_table=connection.ops.quote_name(
+                    relation._meta.db_table
+                ),
+                fk_column=connection.ops.quote_name(
+                    relation._meta.get_field(field).column
+                )
+            ))
+            fixed[f'{model.__name__}.{column}'] = cursor.rowcount
+    return fixed
@@ -1,23 +1,43 @@
 import datetime
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, F, IntegerField, When
 
 from django_filters.rest_framework import (BooleanFilter,
                                            CharFilter,
+                                           ChoiceFilter,
                                            FilterSet,
                                            ModelMultipleChoiceFilter,
+                                           MultipleChoiceFilter,
                                            NumberFilter)
+from rest_framework.exceptions import APIException
 
-from .models import Activity, Event
+from .catalog import activity_choices, get_catalog
+from .locations import radius_to_degrees
+from .models import Comment, Event
+from .routing import GraphUnavailable, travel_times
+from .utils import parse_point
 
 
-class ActivityFilter(FilterSet):
-    """Фильтр для поиска вида активности по первым символам."""
-    name = CharFilter(lookup_expr='startswith')
+class RoutingUnavailable(APIException):
+    status_code = 503
+    default_detail = 'Построение маршрутов недоступно.'
+
+
+class CommentFilter(FilterSet):
+    """Фильтр комментариев новее (after_id) или старше (before_id)
+    заданного."""
+    after_id = NumberFilter(field_name='id', lookup_expr='gt')
+    before_id = NumberFilter(field_name='id', lookup_expr='lt')
 
     class Meta:
-        model = Activity
-        fields = ['name']
+        model = Comment
+        fields = ['after_id', 'before_id']
 
 
 class EventFilter(FilterSet):
@@ -28,10 +48,9 @@ class EventFilter(FilterSet):
         to_field_name='username',
         queryset=get_user_model().objects.all()
     )
-    activities = ModelMultipleChoiceFilter(
-        field_name='activity__name',
-        to_field_name='name',
-        queryset=Activity.objects.all()
+    activities = MultipleChoiceFilter(
+        choices=activity_choices,
+        method='activities_filter'
     )
     in_my_participation_list = BooleanFilter(
         field_name='users_participation_for_event',
@@ -51,6 +70,17 @@ class EventFilter(FilterSet):
         field_name='users_participation_for_event',
         method='is_past_participation_filter'
     )
+    q = CharFilter(method='search_filter')
+    lat = NumberFilter(method='parameter_filter')
+    lon = NumberFilter(method='parameter_filter')
+    radius = NumberFilter(method='radius_filter')
+    near = CharFilter(method='near_filter')
+    travel_mode = ChoiceFilter(
+        choices=[(mode, mode) for mode in settings.ROUTING_SPEEDS],
+        method='parameter_filter'
+    )
+    max_travel_time = NumberFilter(method='parameter_filter')
+    travel_from = CharFilter(method='travel_time_filter')
 
     class Meta:
         model = Event
@@ -89,3 +119,94 @@ class EventFilter(FilterSet):
             return queryset
         return queryset.filter(**{lookup: self.request.user},
                                datetime__lte=datetime.datetime.now())
+
+    def activities_filter(self, queryset, name, value):
+        """Названия видов активности переводятся в id по каталогу
+        в памяти, без соединения с таблицей Activity."""
+        return queryset.filter(
+            activity__in=get_catalog().ids_for_names(value)
+        ).distinct()
+
+    def search_filter(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию мероприятия
+        с сортировкой по ts_rank. Сортировка ?near= и ?travel_from=
+        применяется позже и имеет приоритет."""
+        query = SearchQuery(value, config='russian', search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-datetime', '-id')
+
+    def parameter_filter(self, queryset, name, value):
+        """Параметр, который читает другой фильтр."""
+        return queryset
+
+    def radius_filter(self, queryset, name, value):
+        latitude = self.form.cleaned_data.get('lat')
+        longitude = self.form.cleaned_data.get('lon')
+        if latitude is None or longitude is None:
+            return queryset
+        point = Point(float(longitude), float(latitude), srid=4326)
+        return queryset.filter(
+            location__point__dwithin=(
+                point, radius_to_degrees(float(value), float(latitude))
+            )
+        ).annotate(
+            distance=Distance('location__point', point)
+        ).filter(distance__lte=D(m=float(value)))
+
+    def near_filter(self, queryset, name, value):
+        try:
+            latitude, longitude = parse_point(value)
+        except ValueError:
+            return queryset.none()
+        point = Point(longitude, latitude, srid=4326)
+        return queryset.annotate(
+            distance=Distance('location__point', point)
+        ).order_by(GeometryDistance('location__point', point), 'id')
+
+    def travel_time_filter(self, queryset, name, value):
+        """Оставляет мероприятия, до которых можно добраться
+        за max_travel_time минут, и сортирует их по времени в пути."""
+        try:
+            latitude, longitude = parse_point(value)
+        except ValueError:
+            return queryset.none()
+        mode = self.form.cleaned_data.get('travel_mode') or 'walk'
+        max_time = min(
+            self.form.cleaned_data.get('max_travel_time')
+            or settings.ROUTING_MAX_TRAVEL_TIME,
+            settings.ROUTING_MAX_TRAVEL_TIME
+        ) * 60
+        point = Point(longitude, latitude, srid=4326)
+        reach = float(max_time) * settings.ROUTING_SPEEDS[mode] / 3.6
+
+        candidates = list(queryset.filter(
+            location__point__dwithin=(
+                point, radius_to_degrees(reach, latitude)
+            )
+        ).order_by(
+            GeometryDistance('location__point', point)
+        ).values_list(
+            'id', 'location__point'
+        )[:settings.ROUTING_MAX_CANDIDATES])
+        try:
+            times = travel_times(
+                (latitude, longitude),
+                [(location.y, location.x) for _, location in candidates],
+                mode,
+                float(max_time)
+            )
+        except GraphUnavailable:
+            raise RoutingUnavailable
+        reachable = [
+            When(pk=event_id, then=time)
+            for (event_id, _), time in zip(candidates, times)
+            if time is not None
+        ]
+        if not reachable:
+            return queryset.none()
+        return queryset.annotate(
+            travel_time=Case(*reachable, output_field=IntegerField())
+        ).filter(
+            travel_time__isnull=False
+        ).order_by('travel_time', 'id')
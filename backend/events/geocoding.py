@@ -0,0 +1,279 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from geopy import Yandex
+
+from .cache import invalidate_events
+from .locations import find_location, merge_locations
+from .models import Event, GeocodeCacheEntry, Location
+from .utils import normalize_address
+
+logger = logging.getLogger(__name__)
+
+# Время, на которое воркер резервирует взятые в обработку локации
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+GeocodeResult = namedtuple(
+    'GeocodeResult', ('address', 'latitude', 'longitude')
+)
+
+
+class BaseGeocoder:
+    """Интерфейс провайдера геокодирования."""
+
+    def geocode(self, address):
+        """Возвращает GeocodeResult по адресу или None."""
+        raise NotImplementedError
+
+    def reverse(self, latitude, longitude):
+        """Возвращает GeocodeResult по координатам или None."""
+        raise NotImplementedError
+
+
+class YandexGeocoder(BaseGeocoder):
+    """Геокодер Яндекса."""
+
+    def __init__(self):
+        self.client = Yandex(api_key=settings.API_KEY)
+
+    def _result(self, location):
+        if location is None:
+            return None
+        return GeocodeResult(location.address,
+                             location.latitude,
+                             location.longitude)
+
+    def geocode(self, address):
+        return self._result(self.client.geocode(address))
+
+    def reverse(self, latitude, longitude):
+        return self._result(self.client.reverse((latitude, longitude)))
+
+
+class FakeGeocoder(BaseGeocoder):
+    """Локальный геокодер без сетевых запросов для тестов и разработки.
+
+    Координаты детерминированно вычисляются из хеша адреса
+    в пределах Москвы."""
+    south, west, north, east = 55.55, 37.35, 55.95, 37.85
+
+    def geocode(self, address):
+        digest = hashlib.sha1(
+            normalize_address(address).encode('utf-8')
+        ).digest()
+        latitude = self.south + (self.north - self.south) * digest[0] / 255
+        longitude = self.west + (self.east - self.west) * digest[1] / 255
+        return GeocodeResult(address, latitude, longitude)
+
+    def reverse(self, latitude, longitude):
+        return GeocodeResult(f'{latitude:.5f}, {longitude:.5f}',
+                             latitude,
+                             longitude)
+
+
+class GeocodingCache:
+    """Кеш геокодирования: LRU в памяти процесса поверх таблицы
+    GeocodeCacheEntry.
+
+    Адреса хранятся по нормализованной строке, обратные запросы -
+    по координатам, округленным до `precision` знаков."""
+
+    def __init__(self, provider, max_size, ttl, precision):
+        self.provider = provider
+        self.max_size = max_size
+        self.ttl = timedelta(seconds=ttl)
+        self.precision = precision
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def geocode(self, address):
+        key = f'address:{normalize_address(address)}'
+        return self.lookup(key, lambda: self.provider.geocode(address))
+
+    def reverse(self, latitude, longitude):
+        latitude = round(latitude, self.precision)
+        longitude = round(longitude, self.precision)
+        key = f'point:{latitude},{longitude}'
+        return self.lookup(
+            key, lambda: self.provider.reverse(latitude, longitude)
+        )
+
+    def lookup(self, key, fetch):
+        now = timezone.now()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry[1]
+        return self.load(key, fetch, now)
+
+    def load(self, key, fetch, now):
+        entry = GeocodeCacheEntry.objects.filter(
+            key=key, created_at__gt=now - self.ttl
+        ).first()
+        if entry is not None:
+            result = GeocodeResult(entry.address,
+                                   entry.latitude,
+                                   entry.longitude)
+            self.remember(key, result, entry.created_at + self.ttl)
+            self.count('db_hits')
+            return result
+
+        self.count('misses')
+        result = fetch()
+        if result is not None:
+            GeocodeCacheEntry.objects.update_or_create(
+                key=key,
+                defaults=result._asdict()
+            )
+            self.remember(key, result, now + self.ttl)
+        return result
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        """Попадания в память и в таблицу и промахи с момента
+        запуска процесса."""
+        with self.lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        hits = stats['memory_hits'] + stats['db_hits']
+        stats['hit_ratio'] = round(hits / total, 4) if total else None
+        return stats
+
+    def remember(self, key, result, expires_at):
+        with self.lock:
+            self.entries[key] = (expires_at, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def purge(self):
+        """Удаляет из таблицы записи старше TTL.
+
+        Возвращает количество удаленных записей."""
+        deleted, _ = GeocodeCacheEntry.objects.filter(
+            created_at__lte=timezone.now() - self.ttl
+        ).delete()
+        return deleted
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Возвращает общий для процесса кеширующий геокодер
+    с провайдером из settings.GEOCODER_PROVIDER."""
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = GeocodingCache(
+                provider=import_string(settings.GEOCODER_PROVIDER)(),
+                max_size=settings.GEOCODING_CACHE_SIZE,
+                ttl=settings.GEOCODING_CACHE_TTL,
+                precision=settings.GEOCODING_COORD_PRECISION
+            )
+    return _geocoder
+
+
+def claim_pending_locations(batch_size):
+    """Резервирует пачку локаций, ожидающих геокодирования.
+
+    Строки выбираются с SKIP LOCKED, поэтому несколько воркеров
+    не берут одни и те же локации."""
+    now = timezone.now()
+    with transaction.atomic():
+        locations = list(
+            Location.objects.select_for_update(skip_locked=True).filter(
+                status=Location.Status.PENDING,
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        Location.objects.filter(
+            pk__in=[location.pk for location in locations]
+        ).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return locations
+
+
+def resolve_location(location, geocoder):
+    """Определяет адрес и координаты отложенной локации.
+
+    При ошибке провайдера назначает повторную попытку
+    с экспоненциальной задержкой."""
+    try:
+        if location.point is None:
+            result = geocoder.geocode(location.raw_input)
+        else:
+            result = geocoder.reverse(location.point.y, location.point.x)
+    except Exception:
+        logger.exception('Geocoding failed for location %s', location.pk)
+        location.attempts += 1
+        if location.attempts >= settings.GEOCODING_MAX_ATTEMPTS:
+            location.status = Location.Status.FAILED
+            location.next_attempt_at = None
+        else:
+            location.next_attempt_at = timezone.now() + timedelta(
+                seconds=settings.GEOCODING_RETRY_DELAY
+                * 2 ** (location.attempts - 1)
+            )
+        return location
+
+    location.attempts += 1
+    location.next_attempt_at = None
+    if result is None:
+        location.status = Location.Status.FAILED
+        return location
+    location.address = result.address
+    location.normalized_address = normalize_address(result.address)
+    if location.point is None:
+        location.point = Point(result.longitude, result.latitude, srid=4326)
+    location.status = Location.Status.RESOLVED
+    return location
+
+
+def resolve_pending_locations(batch_size):
+    """Обрабатывает одну пачку отложенных локаций.
+
+    Определенная локация, совпавшая с уже существующей, сливается с ней.
+    Возвращает количество обработанных локаций."""
+    geocoder = get_geocoder()
+    locations = [
+        resolve_location(location, geocoder)
+        for location in claim_pending_locations(batch_size)
+    ]
+    Location.objects.bulk_update(
+        locations,
+        ['address',
+         'normalized_address',
+         'point',
+         'status',
+         'attempts',
+         'next_attempt_at']
+    )
+    if locations:
+        invalidate_events(Event.objects.filter(
+            location__in=[location.pk for location in locations]
+        ).values_list('pk', flat=True))
+    for location in locations:
+        if location.status != Location.Status.RESOLVED:
+            continue
+        existing = find_location(location.address,
+                                 location.point,
+                                 exclude=location.pk)
+        if existing is not None:
+            merge_locations(existing, [location])
+    return len(locations)
@@ -0,0 +1,76 @@
+import math
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.measure import D
+from django.db import transaction
+
+from .cache import invalidate_events
+from .models import Event, Location
+from .utils import normalize_address
+
+METERS_PER_DEGREE = 111320
+
+
+def radius_to_degrees(radius, latitude):
+    """Переводит радиус в метрах в градусы с запасом по долготе,
+    чтобы ST_DWithin по геометрии не отсекал подходящие точки."""
+    return radius / (METERS_PER_DEGREE * max(
+        math.cos(math.radians(latitude)), 0.01
+    ))
+
+
+def find_location(address=None, point=None, exclude=None):
+    """Ищет уже определенную локацию по нормализованному адресу
+    или по точке в радиусе settings.LOCATION_MATCH_RADIUS метров."""
+    locations = Location.objects.filter(status=Location.Status.RESOLVED)
+    if exclude is not None:
+        locations = locations.exclude(pk=exclude)
+
+    normalized_address = normalize_address(address or '')
+    if normalized_address:
+        location = locations.filter(
+            normalized_address=normalized_address
+        ).order_by('id').first()
+        if location is not None:
+            return location
+
+    if point is not None:
+        if isinstance(point, str):
+            point = GEOSGeometry(point, srid=4326)
+        radius = settings.LOCATION_MATCH_RADIUS
+        return locations.filter(
+            point__dwithin=(point, radius_to_degrees(radius, point.y))
+        ).annotate(
+            distance=Distance('point', point)
+        ).filter(
+            distance__lte=D(m=radius)
+        ).order_by('distance', 'id').first()
+    return None
+
+
+def get_or_create_location(location_data):
+    """Возвращает существующую локацию с тем же адресом или рядом
+    с той же точкой, иначе создает новую."""
+    location = find_location(location_data.get('address'),
+                             location_data.get('point'))
+    if location is not None:
+        return location
+    return Location.objects.create(**location_data)
+
+
+@transaction.atomic
+def merge_locations(keeper, duplicates):
+    """Переносит мероприятия дубликатов на основную локацию
+    и удаляет дубликаты."""
+    duplicate_ids = [
+        location.pk for location in duplicates if location.pk != keeper.pk
+    ]
+    events = Event.objects.filter(location__in=duplicate_ids)
+    event_ids = list(events.values_list('pk', flat=True))
+    if event_ids:
+        invalidate_events(event_ids)
+        events.update(location=keeper)
+    Location.objects.filter(pk__in=duplicate_ids).delete()
+    return len(duplicate_ids)
@@ -0,0 +1,227 @@
+import json
+import math
+import subprocess
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from events.models import Activity, Comment, Event, Location
+
+
+def percentile(values, fraction):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class SerializerTimer:
+    """Суммирует время сериализации, подменяя свойство data
+    у Serializer и ListSerializer. Вложенные сериализаторы
+    не учитываются повторно."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.depth = 0
+
+    def wrap(self, getter):
+        timer = self
+
+        def data(serializer):
+            if timer.depth:
+                return getter(serializer)
+            timer.depth += 1
+            started = time.perf_counter()
+            try:
+                return getter(serializer)
+            finally:
+                timer.total += time.perf_counter() - started
+                timer.depth -= 1
+        return property(data)
+
+    @contextmanager
+    def installed(self):
+        originals = {
+            cls: cls.__dict__['data']
+            for cls in (serializers.Serializer, serializers.ListSerializer)
+        }
+        for cls, original in originals.items():
+            cls.data = self.wrap(original.fget)
+        try:
+            yield self
+        finally:
+            for cls, original in originals.items():
+                cls.data = original
+
+
+class Command(BaseCommand):
+    help = ('Measure query counts, latency and serializer time '
+            'of the API endpoints and write a JSON report')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', default='benchmark.json',
+                            help='Path of the JSON report')
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Clear the cache before every request'
+        )
+        parser.add_argument('--only', nargs='+',
+                            help='Run only these endpoints')
+
+    def get_endpoints(self):
+        """Сценарии: имя -> (путь, параметры запроса, пользователь
+        или None для анонима)."""
+        user = get_user_model().objects.annotate(
+            participations=Count('events_participation_for_user')
+        ).order_by('-participations').first()
+        event = Event.objects.order_by('-participants_count').first()
+        comment_event = Comment.objects.values('event').annotate(
+            count=Count('id')
+        ).order_by('-count').values_list('event', flat=True).first()
+        activity = Activity.objects.filter(
+            events_for_activity__isnull=False
+        ).first()
+        location = Location.objects.filter(point__isnull=False).first()
+        if None in (user, event, comment_event, activity, location):
+            raise CommandError(
+                'Not enough data, run generate_dataset first'
+            )
+        point = f'{location.point.y},{location.point.x}'
+        comments = f'/api/events/{comment_event}/comments/'
+        return {
+            'events_list_anonymous': ('/api/events/', {}, None),
+            'events_list': ('/api/events/', {}, user),
+            'events_list_cursor': (
+                '/api/events/', {'pagination': 'cursor'}, user
+            ),
+            'events_retrieve_anonymous': (
+                f'/api/events/{event.pk}/', {}, None
+            ),
+            'events_retrieve': (f'/api/events/{event.pk}/', {}, user),
+            'events_filter_activities': (
+                '/api/events/', {'activities': activity.name}, user
+            ),
+            'events_filter_actual': (
+                '/api/events/', {'is_actual_event': 1}, user
+            ),
+            'events_filter_participation': (
+                '/api/events/', {'in_my_participation_list': 'true'}, user
+            ),
+            'events_filter_radius': (
+                '/api/events/',
+                {'lat': location.point.y,
+                 'lon': location.point.x,
+                 'radius': 2000},
+                user
+            ),
+            'events_near': ('/api/events/', {'near': point}, user),
+            'events_search': (
+                '/api/events/', {'q': event.name.split()[0]}, user
+            ),
+            'comments_list': (comments, {}, user),
+            'comments_poll': (comments, {'after_id': 0}, user),
+            'activities_autocomplete': (
+                '/api/activities/', {'name': activity.name[:2]}, None
+            ),
+            'recommendations': ('/api/users/recommendations/', {}, user),
+            'subscriptions': ('/api/users/subscriptions/', {}, user),
+        }
+
+    def measure(self, path, params, user, options):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        for _ in range(options['warmup']):
+            client.get(path, params)
+
+        latencies, queries, serializer_times = [], [], []
+        status_code = None
+        for _ in range(options['iterations']):
+            if options['no_cache']:
+                cache.clear()
+            timer = SerializerTimer()
+            with CaptureQueriesContext(connection) as context, \
+                    timer.installed():
+                started = time.perf_counter()
+                response = client.get(path, params)
+                latencies.append(time.perf_counter() - started)
+            status_code = response.status_code
+            queries.append(len(context.captured_queries))
+            serializer_times.append(timer.total)
+
+        def ms(value):
+            return round(value * 1000, 3)
+
+        return {
+            'path': path,
+            'params': {name: str(value) for name, value in params.items()},
+            'authenticated': user is not None,
+            'status': status_code,
+            'queries': max(queries),
+            'latency_p50_ms': ms(percentile(latencies, 0.5)),
+            'latency_p95_ms': ms(percentile(latencies, 0.95)),
+            'latency_mean_ms': ms(sum(latencies) / len(latencies)),
+            'serializer_p50_ms': ms(percentile(serializer_times, 0.5)),
+            'serializer_p95_ms': ms(percentile(serializer_times, 0.95)),
+        }
+
+    def get_revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        endpoints = self.get_endpoints()
+        names = options['only'] or list(endpoints)
+        unknown = set(names) - set(endpoints)
+        if unknown:
+            raise CommandError(f'Unknown endpoints: {", ".join(unknown)}')
+
+        results = {}
+        for name in names:
+            path, params, user = endpoints[name]
+            results[name] = self.measure(path, params, user, options)
+            self.stdout.write(
+                f'{name}: {results[name]["status"]}, '
+                f'{results[name]["queries"]} queries, '
+                f'p50 {results[name]["latency_p50_ms"]} ms, '
+                f'p95 {results[name]["latency_p95_ms"]} ms'
+            )
+
+        report = {
+            'meta': {
+                'revision': self.get_revision(),
+                'created_at': timezone.now().isoformat(),
+                'iterations': options['iterations'],
+                'cache': not options['no_cache'],
+                'dataset': {
+                    'users': get_user_model().objects.count(),
+                    'events': Event.objects.count(),
+                    'comments': Comment.objects.count(),
+                },
+            },
+            'endpoints': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Report written to {options["output"]}'
+        ))
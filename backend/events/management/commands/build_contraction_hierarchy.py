@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.contraction import (build_contraction_hierarchy,
+                                save_contraction_hierarchy)
+from events.routing import StreetGraph
+
+
+class Command(BaseCommand):
+    help = 'Precompute a contraction hierarchy for the routing street graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--graph-dir',
+            default=settings.ROUTING_GRAPH_DIR,
+            help='Directory with the graph built by build_street_graph'
+        )
+
+    def progress(self, done, total):
+        self.stdout.write(f'Contracted {done}/{total} nodes')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph = StreetGraph(options['graph_dir'])
+        arrays = build_contraction_hierarchy(graph.indptr,
+                                             graph.indices,
+                                             graph.weights,
+                                             progress=self.progress)
+        save_contraction_hierarchy(options['graph_dir'], arrays)
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved hierarchy with {len(arrays["ch_up_indices"])} upward and '
+            f'{len(arrays["ch_down_indices"])} downward edges '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,37 @@
+import time
+
+import osmnx as ox
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from events.routing import save_street_graph
+
+
+class Command(BaseCommand):
+    help = 'Build the routing street graph from a local OSM XML extract'
+
+    def add_arguments(self, parser):
+        parser.add_argument('osm_file', help='Path to a .osm XML extract')
+        parser.add_argument(
+            '--output',
+            default=settings.ROUTING_GRAPH_DIR,
+            help='Directory for the serialized graph arrays'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph = ox.graph_from_xml(options['osm_file'], bidirectional=True)
+        index = {node: position for position, node in enumerate(graph.nodes)}
+        node_lat = [graph.nodes[node]['y'] for node in graph.nodes]
+        node_lon = [graph.nodes[node]['x'] for node in graph.nodes]
+        edges = (
+            (index[u], index[v], data['length'])
+            for u, v, data in graph.edges(data=True)
+        )
+        save_street_graph(options['output'], node_lat, node_lon, edges)
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved graph with {len(node_lat)} nodes and '
+            f'{graph.number_of_edges()} edges to {options["output"]} '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
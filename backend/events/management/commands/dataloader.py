@@ -1,32 +1,297 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from events.models import Activity
+from events.cache import invalidate_events
+from events.catalog import invalidate_catalog
+from events.models import (Activity,
+                           ActivityForEvent,
+                           Comment,
+                           Event,
+                           LoaderCheckpoint,
+                           Location,
+                           Participation)
+from events.utils import normalize_address
 
+# Наборы данных в порядке загрузки: файл <имя>.csv или <имя>.ndjson
+DATASETS = ('activity',
+            'users',
+            'locations',
+            'events',
+            'participations',
+            'comments')
 
-DATA = {Activity: 'activity.csv'}
+
+def read_rows(path):
+    """Построчно читает CSV с заголовком или NDJSON."""
+    with open(path, 'r', encoding='utf-8') as file:
+        if path.suffix == '.ndjson':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(file)
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class Command(BaseCommand):
-    help = 'Import data from file to DB'
+    help = ('Bulk load activities, users, locations, events, '
+            'participations and comments from CSV/NDJSON files')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=f'{settings.BASE_DIR}/data',
+            help='Directory with <dataset>.csv or <dataset>.ndjson files'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Number of rows inserted per transaction'
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip rows loaded by a previous interrupted run'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=DATASETS,
+            help='Load only these datasets'
+        )
+
+    def find_file(self, data_dir, dataset):
+        for suffix in ('.ndjson', '.csv'):
+            path = data_dir / f'{dataset}{suffix}'
+            if path.exists():
+                return path
+        return None
+
+    def row_error(self, index, message):
+        """Ошибка строки `index` текущей пачки с номером строки файла."""
+        return CommandError(
+            f'{self.dataset}: row {self.first_row + index}: {message}'
+        )
+
+    def build_maps(self):
+        """Словари внешних ключей: натуральный ключ -> id."""
+        self.activities = dict(Activity.objects.values_list('name', 'id'))
+        self.users = dict(
+            get_user_model().objects.values_list('username', 'id')
+        )
+        self.events = set(Event.objects.values_list('id', flat=True))
+        self.locations = {}
+        for address, pk in Location.objects.filter(
+            status=Location.Status.RESOLVED
+        ).order_by('-id').values_list('normalized_address', 'id'):
+            self.locations[address] = pk
 
-    def import_data_from_csv_file(self):
-        for model, csv_file in DATA.items():
-            with open(
-                    f'{settings.BASE_DIR}/data/{csv_file}',
-                    'r',
-                    encoding='utf-8',
-            ) as file:
-                reader = csv.DictReader(file)
+    def load_activity(self, rows):
+        Activity.objects.bulk_create(
+            [Activity(name=row['name']) for row in rows],
+            ignore_conflicts=True
+        )
+        self.activities = dict(Activity.objects.values_list('name', 'id'))
+        return len(rows)
 
-                for data in reader:
-                    model.objects.get_or_create(
-                        name=data['name']
-                    )
+    def load_users(self, rows):
+        User = get_user_model()
+        users = [
+            User(username=row['username'],
+                 email=row['email'],
+                 first_name=row.get('first_name', ''),
+                 last_name=row.get('last_name', ''),
+                 phone_number=row['phone_number'],
+                 birth_year=row.get('birth_year') or None,
+                 # Пароль в файле - уже захешированный, иначе
+                 # пользователь не сможет войти до сброса пароля
+                 password=row.get('password') or self.unusable_password)
+            for row in rows
+        ]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        self.users.update(User.objects.filter(
+            username__in=[user.username for user in users]
+        ).values_list('username', 'id'))
+        return len(users)
 
-        self.stdout.write(self.style.SUCCESS('Successfully loaded data'))
+    def load_locations(self, rows):
+        locations = {}
+        for row in rows:
+            normalized = normalize_address(row['address'])
+            if normalized in self.locations or normalized in locations:
+                continue
+            locations[normalized] = Location(
+                address=row['address'],
+                normalized_address=normalized,
+                point=Point(float(row['longitude']),
+                            float(row['latitude']),
+                            srid=4326)
+            )
+        created = Location.objects.bulk_create(locations.values())
+        self.locations.update(
+            (location.normalized_address, location.pk)
+            for location in created
+        )
+        return len(created)
+
+    def load_events(self, rows):
+        events = []
+        activities = []
+        for index, row in enumerate(rows):
+            author = self.users.get(row['author'])
+            location = self.locations.get(normalize_address(row['address']))
+            if author is None or location is None:
+                self.skipped += 1
+                continue
+            # Связи и комментарии из файла ссылаются на id мероприятия:
+            # занятый id привязал бы их к чужому мероприятию
+            event_id = int(row['id'])
+            if event_id in self.events:
+                raise self.row_error(
+                    index, f'event id {event_id} already exists'
+                )
+            try:
+                event_datetime = parse_datetime(row['datetime'])
+            except (TypeError, ValueError):
+                event_datetime = None
+            if event_datetime is None:
+                raise self.row_error(
+                    index, f'invalid datetime {row["datetime"]!r}'
+                )
+            if timezone.is_naive(event_datetime):
+                event_datetime = timezone.make_aware(event_datetime)
+            self.events.add(event_id)
+            events.append(Event(id=event_id,
+                                name=row['name'],
+                                description=row.get('description', ''),
+                                datetime=event_datetime,
+                                duration=int(row['duration']),
+                                author_id=author,
+                                location_id=location))
+            names = row.get('activities') or ''
+            if isinstance(names, str):
+                names = [name for name in names.split(';') if name]
+            activities.extend(
+                ActivityForEvent(event_id=event_id,
+                                 activity_id=self.activities[name])
+                for name in names if name in self.activities
+            )
+        Event.objects.bulk_create(events)
+        ActivityForEvent.objects.bulk_create(activities,
+                                             ignore_conflicts=True)
+        return len(events)
+
+    def load_participations(self, rows):
+        participations = []
+        for row in rows:
+            user = self.users.get(row['user'])
+            if user is None or int(row['event']) not in self.events:
+                self.skipped += 1
+                continue
+            participations.append(
+                Participation(event_id=int(row['event']), user_id=user)
+            )
+        Participation.objects.bulk_create(participations,
+                                          ignore_conflicts=True)
+        return len(participations)
+
+    def load_comments(self, rows):
+        comments = []
+        for row in rows:
+            author = self.users.get(row['author'])
+            if author is None or int(row['event']) not in self.events:
+                self.skipped += 1
+                continue
+            comments.append(Comment(event_id=int(row['event']),
+                                    author_id=author,
+                                    text=row['text']))
+        Comment.objects.bulk_create(comments)
+        return len(comments)
+
+    def load_dataset(self, dataset, path, chunk_size, resume):
+        loader = getattr(self, f'load_{dataset}')
+        checkpoint = str(path.resolve())
+        done = 0
+        if resume:
+            done = LoaderCheckpoint.objects.filter(
+                dataset=checkpoint
+            ).values_list('rows', flat=True).first() or 0
+        rows = islice(read_rows(path), done, None)
+        if done:
+            self.stdout.write(f'{dataset}: resuming after {done} rows')
+        self.dataset = path.name
+        started = time.monotonic()
+        read = loaded = 0
+        for chunk in chunked(rows, chunk_size):
+            self.first_row = done + read + 1
+            with transaction.atomic():
+                loaded += loader(chunk)
+                read += len(chunk)
+                LoaderCheckpoint.objects.update_or_create(
+                    dataset=checkpoint, defaults={'rows': done + read}
+                )
+            rate = read / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'{dataset}: {done + read} rows read, {loaded} loaded, '
+                f'{rate:.0f} rows/s'
+            )
 
     def handle(self, *args, **options):
-        self.import_data_from_csv_file()
+        data_dir = Path(options['data_dir'])
+        if not data_dir.is_dir():
+            raise CommandError(f'{data_dir} is not a directory')
+        self.unusable_password = make_password(None)
+        self.skipped = 0
+        self.build_maps()
+
+        started = time.monotonic()
+        paths = []
+        for dataset in options['only'] or DATASETS:
+            path = self.find_file(data_dir, dataset)
+            if path is None:
+                continue
+            self.load_dataset(dataset, path, options['chunk_size'],
+                              options['resume'])
+            paths.append(str(path.resolve()))
+
+        # Мероприятия загружаются с id из файла
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                         [Event]):
+                cursor.execute(sql)
+        # bulk_create не отправляет сигналы: сбрасываем кеши явно
+        invalidate_events()
+        invalidate_catalog()
+        LoaderCheckpoint.objects.filter(dataset__in=paths).delete()
+
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {self.skipped} rows with unknown references'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully loaded data in '
+            f'{time.monotonic() - started:.1f}s. '
+            f'Run rebuild_recommendations to refresh recommendations'
+        ))
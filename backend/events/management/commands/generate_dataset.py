@@ -0,0 +1,218 @@
+import csv
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events.cache import invalidate_events
+from events.catalog import invalidate_catalog
+from events.models import (Activity,
+                           ActivityForEvent,
+                           Comment,
+                           Event,
+                           Like,
+                           Location,
+                           Participation)
+from events.recommendations import refresh_recommendations
+from users.models import FavoriteActivity, Subscribe
+
+# Границы города (Москва), в которых размещаются мероприятия
+CITY_BBOX = (55.55, 37.35, 55.95, 37.85)
+
+CHUNK_SIZE = 5000
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса распределения Ципфа: немногие объекты получают
+    большую часть участников, лайков и подписчиков."""
+    return list(accumulate(
+        1 / (rank ** exponent) for rank in range(1, size + 1)
+    ))
+
+
+def unique_pairs(rng, count, left, right, right_weights,
+                 exclude_equal=False):
+    """Не более `count` уникальных пар (left, right), правый элемент
+    выбирается с накопленными весами `right_weights`."""
+    pairs = set()
+    for _ in range(10):
+        needed = count - len(pairs)
+        if needed <= 0 or not left or not right:
+            break
+        firsts = rng.choices(left, k=needed)
+        seconds = rng.choices(right, cum_weights=right_weights, k=needed)
+        pairs.update(
+            (first, second) for first, second in zip(firsts, seconds)
+            if not exclude_equal or first != second
+        )
+    return pairs
+
+
+def bulk_create(model, objects, ignore_conflicts=True):
+    objects = iter(objects)
+    while True:
+        chunk = list(islice(objects, CHUNK_SIZE))
+        if not chunk:
+            return
+        model.objects.bulk_create(chunk, ignore_conflicts=ignore_conflicts)
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset for benchmarks'
+
+    def add_arguments(self, parser):
+        sizes = {'users': 1000,
+                 'activities': 40,
+                 'locations': 500,
+                 'events': 5000,
+                 'participations': 50000,
+                 'comments': 20000,
+                 'likes': 50000,
+                 'subscriptions': 10000}
+        for name, default in sizes.items():
+            parser.add_argument(f'--{name}', type=int, default=default,
+                                help=f'Number of {name} (default {default})')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Zipf exponent of popularity')
+        parser.add_argument('--prefix', default='bench',
+                            help='Prefix of generated usernames')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def activity_names(self, count):
+        with open(f'{settings.BASE_DIR}/data/activity.csv',
+                  'r', encoding='utf-8') as file:
+            names = [row['name'] for row in csv.DictReader(file)]
+        names = names[:count]
+        names += [f'Активность {index}'
+                  for index in range(len(names) + 1, count + 1)]
+        return names
+
+    def create_users(self, options):
+        User = get_user_model()
+        prefix = options['prefix']
+        password = make_password('benchmark')
+        bulk_create(User, (
+            User(username=f'{prefix}_{index}',
+                 email=f'{prefix}_{index}@example.com',
+                 first_name='Имя',
+                 last_name='Фамилия',
+                 phone_number=f'+7900{index:07d}',
+                 birth_year=self.rng.randint(1960, 2008),
+                 password=password)
+            for index in range(options['users'])
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).values_list('id', flat=True))
+
+    def create_locations(self, count):
+        south, west, north, east = CITY_BBOX
+        locations = [
+            Location(address=f'Москва, улица Тестовая, {index}',
+                     normalized_address=f'москва улица тестовая {index}',
+                     point=Point(self.rng.uniform(west, east),
+                                 self.rng.uniform(south, north),
+                                 srid=4326))
+            for index in range(count)
+        ]
+        return [location.pk for location
+                in Location.objects.bulk_create(locations)]
+
+    def create_events(self, count, users, locations, activities):
+        now = timezone.now()
+        events = Event.objects.bulk_create([
+            Event(name=f'Тренировка {index}',
+                  description=self.rng.choice((
+                      'Открытая тренировка для всех уровней подготовки.',
+                      'Собираем команду на дружескую игру.',
+                      'Утренняя пробежка по набережной.',
+                      'Турнир выходного дня, регистрация на месте.',
+                  )),
+                  datetime=now + timedelta(
+                      minutes=self.rng.randint(-30 * 24 * 60, 60 * 24 * 60)
+                  ),
+                  duration=self.rng.choice((60, 90, 120, 180)),
+                  author_id=self.rng.choice(users),
+                  location_id=self.rng.choice(locations))
+            for index in range(count)
+        ], batch_size=CHUNK_SIZE)
+        bulk_create(ActivityForEvent, (
+            ActivityForEvent(event_id=event.pk, activity_id=activity)
+            for event in events
+            for activity in self.rng.sample(
+                activities, min(len(activities), self.rng.randint(1, 3))
+            )
+        ))
+        return [event.pk for event in events]
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        skew = options['skew']
+
+        with transaction.atomic():
+            names = self.activity_names(options['activities'])
+            Activity.objects.bulk_create(
+                [Activity(name=name) for name in names],
+                ignore_conflicts=True
+            )
+            activities = list(Activity.objects.filter(
+                name__in=names
+            ).values_list('id', flat=True))
+            users = self.create_users(options)
+            self.stdout.write(f'{len(users)} users')
+            bulk_create(FavoriteActivity, (
+                FavoriteActivity(user_id=user, activity_id=activity)
+                for user in users
+                for activity in self.rng.sample(
+                    activities, min(len(activities), self.rng.randint(1, 3))
+                )
+            ))
+
+            locations = self.create_locations(options['locations'])
+            events = self.create_events(options['events'], users,
+                                        locations, activities)
+            self.stdout.write(f'{len(events)} events')
+
+            event_weights = zipf_weights(len(events), skew)
+            bulk_create(Participation, (
+                Participation(user_id=user, event_id=event)
+                for user, event in unique_pairs(
+                    self.rng, options['participations'],
+                    users, events, event_weights
+                )
+            ))
+            comments = Comment.objects.bulk_create([
+                Comment(event_id=event,
+                        author_id=self.rng.choice(users),
+                        text='Отличное мероприятие, буду!')
+                for event in self.rng.choices(
+                    events, cum_weights=event_weights, k=options['comments']
+                )
+            ], batch_size=CHUNK_SIZE)
+            comments = [comment.pk for comment in comments]
+            bulk_create(Like, (
+                Like(user_id=user, comment_id=comment)
+                for user, comment in unique_pairs(
+                    self.rng, options['likes'], users, comments,
+                    zipf_weights(len(comments), skew)
+                )
+            ))
+            bulk_create(Subscribe, (
+                Subscribe(user_id=user, author_id=author)
+                for user, author in unique_pairs(
+                    self.rng, options['subscriptions'], users, users,
+                    zipf_weights(len(users), skew), exclude_equal=True
+                )
+            ))
+            refresh_recommendations(users=users)
+            invalidate_events()
+            invalidate_catalog()
+
+        self.stdout.write(self.style.SUCCESS('Dataset generated'))
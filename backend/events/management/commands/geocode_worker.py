@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from events.geocoding import get_geocoder, resolve_pending_locations
+
+
+class Command(BaseCommand):
+    help = 'Resolve pending event locations in the background'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of locations claimed per batch'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when there is nothing to resolve'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process a single batch and exit'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            resolved = resolve_pending_locations(options['batch_size'])
+            if resolved:
+                stats = get_geocoder().get_stats()
+                self.stdout.write(
+                    f'Processed {resolved} locations, geocoding cache: '
+                    f'{stats["memory_hits"]} memory hits, '
+                    f'{stats["db_hits"]} db hits, '
+                    f'{stats["misses"]} misses'
+                )
+            if options['once']:
+                break
+            if not resolved:
+                time.sleep(options['interval'])
@@ -0,0 +1,433 @@
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler,
+                                          get_internal_wsgi_application)
+from django.db import connection
+
+from rest_framework.authtoken.models import Token
+
+from events.models import Comment, Event
+
+# Границы корзин гистограммы задержек, мс
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Сценарии виртуального пользователя и их веса
+SCENARIO_WEIGHTS = {
+    'browse_feed': 5,
+    'open_event': 4,
+    'comment': 1,
+    'like': 2,
+    'join': 2,
+}
+
+POOL_ACTIVITY_SQL = '''
+    SELECT state, wait_event_type, COUNT(*)
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+    GROUP BY state, wait_event_type
+'''
+
+
+class HttpConnection:
+    """Минимальный HTTP/1.1 клиент на asyncio streams
+    с переиспользованием соединения (keep-alive)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+        self.opened = 0
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, token=None, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+            self.opened += 1
+        payload = json.dumps(body).encode() if body is not None else b''
+        headers = [f'{method} {path} HTTP/1.1',
+                   f'Host: {self.host}:{self.port}',
+                   'Accept: application/json',
+                   f'Content-Length: {len(payload)}']
+        if body is not None:
+            headers.append('Content-Type: application/json')
+        if token is not None:
+            headers.append(f'Authorization: Token {token}')
+        try:
+            self.writer.write(
+                ('\r\n'.join(headers) + '\r\n\r\n').encode() + payload
+            )
+            await self.writer.drain()
+            return await self.read_response()
+        except (asyncio.IncompleteReadError, OSError, ValueError):
+            await self.close()
+            raise
+
+    async def read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(
+                    b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.read()
+            await self.close()
+            return status
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Обработчик запросов без журнала каждого запроса в stderr."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Stats:
+    """Задержки, статусы и ошибки по эндпоинтам."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, status, latency):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+
+    def fail(self, endpoint):
+        self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(values, fraction):
+        ordered = sorted(values)
+        return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+    @staticmethod
+    def histogram(values):
+        counts = dict.fromkeys([str(bucket) for bucket in HISTOGRAM_BUCKETS]
+                               + ['inf'], 0)
+        for value in values:
+            for bucket in HISTOGRAM_BUCKETS:
+                if value * 1000 <= bucket:
+                    counts[str(bucket)] += 1
+                    break
+            else:
+                counts['inf'] += 1
+        return counts
+
+    def report(self, duration):
+        endpoints = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            latencies = self.latencies[endpoint]
+            statuses = self.statuses[endpoint]
+            total = len(latencies) + self.errors[endpoint]
+            failed = self.errors[endpoint] + sum(
+                count for status, count in statuses.items() if status >= 500
+            )
+            endpoints[endpoint] = {
+                'requests': total,
+                'rps': round(total / duration, 2),
+                'error_rate': round(failed / total, 4) if total else 0,
+                'statuses': {str(status): count
+                             for status, count in sorted(statuses.items())},
+                'connection_errors': self.errors[endpoint],
+            }
+            if latencies:
+                endpoints[endpoint].update({
+                    'latency_p50_ms': round(
+                        self.percentile(latencies, 0.5) * 1000, 2),
+                    'latency_p95_ms': round(
+                        self.percentile(latencies, 0.95) * 1000, 2),
+                    'latency_p99_ms': round(
+                        self.percentile(latencies, 0.99) * 1000, 2),
+                    'histogram_ms': self.histogram(latencies),
+                })
+        return endpoints
+
+
+class DatabaseSampler(threading.Thread):
+    """Раз в секунду снимает состояние соединений PostgreSQL:
+    сколько их занято и сколько ждут блокировок."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stop = threading.Event()
+        self.max_connections = 0
+        self.max_active = 0
+        self.max_lock_waits = 0
+
+    def run(self):
+        try:
+            while not self.stop.wait(1):
+                with connection.cursor() as cursor:
+                    cursor.execute(POOL_ACTIVITY_SQL)
+                    rows = cursor.fetchall()
+                self.max_connections = max(
+                    self.max_connections, sum(row[2] for row in rows)
+                )
+                self.max_active = max(self.max_active, sum(
+                    row[2] for row in rows if row[0] == 'active'
+                ))
+                self.max_lock_waits = max(self.max_lock_waits, sum(
+                    row[2] for row in rows if row[1] == 'Lock'
+                ))
+        finally:
+            connection.close()
+
+
+class VirtualUser:
+    """Виртуальный пользователь: выполняет взвешенные сценарии
+    до истечения времени теста."""
+
+    def __init__(self, client, token, data, stats, rng, think_time,
+                 timeout):
+        self.client = client
+        self.token = token
+        self.data = data
+        self.stats = stats
+        self.rng = rng
+        self.think_time = think_time
+        self.timeout = timeout
+
+    async def call(self, endpoint, method, path, body=None):
+        started = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(
+                self.client.request(method, path, self.token, body),
+                self.timeout
+            )
+        except asyncio.TimeoutError:
+            # Ответ может прийти позже и сбить чтение следующего
+            await self.client.close()
+            self.stats.fail(endpoint)
+            return None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.stats.fail(endpoint)
+            return None
+        self.stats.record(endpoint, status, time.perf_counter() - started)
+        return status
+
+    def event(self):
+        return self.rng.choices(self.data['events'],
+                                cum_weights=self.data['event_weights'])[0]
+
+    async def browse_feed(self):
+        page = self.rng.randint(1, 5)
+        await self.call('GET /events/', 'GET',
+                        f'/api/events/?{urlencode({"page": page})}')
+
+    async def open_event(self):
+        event = self.event()
+        await self.call('GET /events/{id}/', 'GET', f'/api/events/{event}/')
+        await self.call('GET /events/{id}/comments/', 'GET',
+                        f'/api/events/{event}/comments/')
+
+    async def comment(self):
+        await self.call('POST /events/{id}/comments/', 'POST',
+                        f'/api/events/{self.event()}/comments/',
+                        {'text': self.data['comment_text']})
+
+    async def like(self):
+        if not self.data['comments']:
+            return
+        event, comment = self.rng.choice(self.data['comments'])
+        path = f'/api/events/{event}/comments/{comment}/like/'
+        # Удаляется только созданная тестом связь, иначе каждый
+        # прогон снимал бы настоящие лайки и участия
+        if await self.call('POST /comments/{id}/like/',
+                           'POST', path) == 201:
+            await self.call('DELETE /comments/{id}/like/', 'DELETE', path)
+
+    async def join(self):
+        path = f'/api/events/{self.event()}/participate/'
+        if await self.call('POST /events/{id}/participate/',
+                           'POST', path) == 201:
+            await self.call('DELETE /events/{id}/participate/',
+                            'DELETE', path)
+
+    async def run(self, deadline):
+        names = list(SCENARIO_WEIGHTS)
+        weights = list(SCENARIO_WEIGHTS.values())
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(names, weights=weights)[0]
+            await getattr(self, scenario)()
+            if self.think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+        await self.client.close()
+
+
+class Command(BaseCommand):
+    help = ('Run weighted user scenarios with many concurrent async '
+            'clients against a local server and report latencies')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Base URL of a running server')
+        parser.add_argument(
+            '--serve',
+            action='store_true',
+            help='Start a threaded WSGI server in this process instead'
+        )
+        parser.add_argument('--clients', type=int, default=50,
+                            help='Number of concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Test duration, seconds')
+        parser.add_argument('--think-time', type=float, default=0,
+                            help='Mean pause between scenarios, seconds')
+        parser.add_argument('--timeout', type=float, default=10,
+                            help='Timeout of a single request, seconds')
+        parser.add_argument('--user-prefix', default='bench',
+                            help='Prefix of generated users to log in as')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Path of the JSON report')
+
+    def load_data(self, options):
+        users = list(get_user_model().objects.filter(
+            username__startswith=f'{options["user_prefix"]}_'
+        ).order_by('id')[:options['clients']])
+        if not users:
+            raise CommandError('No users found, run generate_dataset first')
+        tokens = [Token.objects.get_or_create(user=user)[0].key
+                  for user in users]
+        events = list(Event.objects.order_by(
+            '-participants_count', 'id'
+        ).values_list('id', flat=True)[:1000])
+        if not events:
+            raise CommandError('No events found, run generate_dataset first')
+        comments = list(Comment.objects.filter(
+            event__in=events[:100]
+        ).order_by('-likes_count').values_list('event', 'id')[:1000])
+        weights, total = [], 0.0
+        for rank in range(1, len(events) + 1):
+            total += 1 / rank
+            weights.append(total)
+        return tokens, {'events': events,
+                        'event_weights': weights,
+                        'comments': comments,
+                        # Метка прогона: по ней созданные комментарии
+                        # удаляются после теста
+                        'comment_text': f'Нагрузочный тест {uuid.uuid4()}'}
+
+    def start_server(self):
+        """Запускает многопоточный WSGI-сервер Django
+        на свободном локальном порту."""
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(get_internal_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    async def run_clients(self, host, port, tokens, data, options):
+        stats = Stats()
+        deadline = time.monotonic() + options['duration']
+        clients = [HttpConnection(host, port)
+                   for _ in range(options['clients'])]
+        users = [
+            VirtualUser(client,
+                        tokens[index % len(tokens)],
+                        data,
+                        stats,
+                        random.Random(options['seed'] + index),
+                        options['think_time'],
+                        options['timeout'])
+            for index, client in enumerate(clients)
+        ]
+        await asyncio.gather(*(user.run(deadline) for user in users))
+        return stats, sum(client.opened for client in clients)
+
+    def handle(self, *args, **options):
+        tokens, data = self.load_data(options)
+        server = None
+        if options['serve']:
+            server = self.start_server()
+            host, port = server.server_address[:2]
+        else:
+            url = urlsplit(options['url'])
+            host, port = url.hostname, url.port or 80
+        connection.close()
+
+        sampler = DatabaseSampler()
+        sampler.start()
+        started = time.monotonic()
+        try:
+            stats, opened = asyncio.run(
+                self.run_clients(host, port, tokens, data, options)
+            )
+        finally:
+            duration = time.monotonic() - started
+            sampler.stop.set()
+            sampler.join()
+            if server is not None:
+                server.shutdown()
+            removed, _ = Comment.objects.filter(
+                text=data['comment_text']
+            ).delete()
+            self.stdout.write(
+                f'Removed {removed} objects created by the test'
+            )
+
+        endpoints = stats.report(duration)
+        total = sum(endpoint['requests'] for endpoint in endpoints.values())
+        report = {
+            'clients': options['clients'],
+            'duration_s': round(duration, 2),
+            'requests': total,
+            'throughput_rps': round(total / duration, 2),
+            'client_connections_opened': opened,
+            'db_max_connections': sampler.max_connections,
+            'db_max_active': sampler.max_active,
+            'db_max_lock_waits': sampler.max_lock_waits,
+            'endpoints': endpoints,
+        }
+        for name, endpoint in endpoints.items():
+            self.stdout.write(
+                f'{name}: {endpoint["requests"]} requests, '
+                f'{endpoint["rps"]} rps, '
+                f'errors {endpoint["error_rate"]:.2%}, '
+                f'p50 {endpoint.get("latency_p50_ms")} ms, '
+                f'p95 {endpoint.get("latency_p95_ms")} ms'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} requests in {duration:.1f}s, '
+            f'{report["throughput_rps"]} rps'
+        ))
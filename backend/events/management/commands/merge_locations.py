@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min
+
+from events.locations import find_location, merge_locations
+from events.models import Location
+
+
+class Command(BaseCommand):
+    help = 'Merge duplicate locations and repoint their events'
+
+    def merge_by_address(self):
+        merged = 0
+        groups = Location.objects.filter(
+            status=Location.Status.RESOLVED
+        ).exclude(
+            normalized_address=''
+        ).values('normalized_address').annotate(
+            count=Count('id'), keeper=Min('id')
+        ).filter(count__gt=1).order_by()
+
+        for group in groups:
+            keeper = Location.objects.get(pk=group['keeper'])
+            duplicates = Location.objects.filter(
+                status=Location.Status.RESOLVED,
+                normalized_address=group['normalized_address']
+            ).exclude(pk=keeper.pk)
+            merged += merge_locations(keeper, duplicates)
+        return merged
+
+    def merge_by_point(self):
+        merged = 0
+        location_ids = Location.objects.filter(
+            status=Location.Status.RESOLVED,
+            point__isnull=False
+        ).order_by('id').values_list('id', flat=True)
+
+        for location_id in location_ids.iterator():
+            location = Location.objects.filter(pk=location_id).first()
+            if location is None:
+                continue
+            while True:
+                duplicate = find_location(point=location.point,
+                                          exclude=location.pk)
+                if duplicate is None:
+                    break
+                keeper, duplicate = sorted([location, duplicate],
+                                           key=lambda item: item.pk)
+                merged += merge_locations(keeper, [duplicate])
+                location = keeper
+        return merged
+
+    def handle(self, *args, **options):
+        by_address = self.merge_by_address()
+        by_point = self.merge_by_point()
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {by_address} locations by address '
+            f'and {by_point} by point'
+        ))
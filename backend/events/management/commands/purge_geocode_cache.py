@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from events.geocoding import get_geocoder
+
+
+class Command(BaseCommand):
+    help = 'Delete expired geocoding cache entries'
+
+    def handle(self, *args, **options):
+        deleted = get_geocoder().purge()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired geocoding entries'
+        ))
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from events.models import Recommendation
+from events.recommendations import refresh_recommendations
+from users.models import FavoriteActivity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user recommendation table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of parallel workers'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users recomputed by one worker task'
+        )
+
+    def refresh_chunk(self, users):
+        try:
+            refresh_recommendations(users=users)
+        finally:
+            connection.close()
+        return len(users)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        user_ids = list(
+            FavoriteActivity.objects.order_by(
+                'user_id'
+            ).values_list('user_id', flat=True).distinct()
+        )
+        chunks = [
+            user_ids[index:index + chunk_size]
+            for index in range(0, len(user_ids), chunk_size)
+        ]
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for count in executor.map(self.refresh_chunk, chunks):
+                done += count
+                self.stdout.write(f'{done}/{len(user_ids)} users')
+
+        # refresh_recommendations заменяет строки каждого пользователя
+        # в своей транзакции: удаляются только пользователи,
+        # у которых больше нет любимых видов активности
+        Recommendation.objects.exclude(
+            user__in=FavoriteActivity.objects.values('user')
+        ).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt recommendations: '
+            f'{Recommendation.objects.count()} rows'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from events.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount participants, likes and subscribers counters'
+
+    def handle(self, *args, **options):
+        for counter, fixed in reconcile_counters().items():
+            self.stdout.write(f'{counter}: {fixed} rows fixed')
+        self.stdout.write(self.style.SUCCESS('Counters reconciled'))
@@ -0,0 +1,75 @@
+from django.db import models
+from django.db.models import (Exists,
+                              F,
+                              OuterRef,
+                              Prefetch,
+                              Value,
+                              Window)
+from django.db.models.functions import RowNumber
+
+
+class EventQuerySet(models.QuerySet):
+    """Кверисет мероприятий с аннотациями для сериализатора."""
+
+    def with_related(self):
+        """Подгружает автора, локацию и виды активности мероприятий."""
+        return self.select_related(
+            'author', 'location'
+        ).prefetch_related('activity')
+
+    def with_user_data(self, user):
+        """Добавляет флаги 'в избранном' и 'участвую'."""
+        from .models import FavoriteEvent, Participation
+
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorite=Value(False),
+                is_participate=Value(False)
+            )
+        return self.annotate(
+            is_favorite=Exists(FavoriteEvent.objects.filter(
+                user=user, event=OuterRef('pk')
+            )),
+            is_participate=Exists(Participation.objects.filter(
+                user=user, event=OuterRef('pk')
+            ))
+        )
+
+    def with_comments_preview(self, user, size):
+        """Подгружает последние `size` комментариев для всех мероприятий
+        одним запросом с ROW_NUMBER() OVER (PARTITION BY event_id).
+
+        Комментарии сохраняются в атрибут `comments_preview`."""
+        if size <= 0:
+            return self
+        from .models import Comment
+
+        comments = Comment.objects.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('event'),
+                order_by=F('id').desc()
+            )
+        ).filter(
+            row_number__lte=size
+        ).select_related('author').with_user_data(user).order_by('-id')
+
+        return self.prefetch_related(
+            Prefetch('comments', queryset=comments, to_attr='comments_preview')
+        )
+
+
+class CommentQuerySet(models.QuerySet):
+    """Кверисет комментариев с аннотациями для сериализатора."""
+
+    def with_user_data(self, user):
+        """Добавляет флаг 'оценил'."""
+        from .models import Like
+
+        if user.is_anonymous:
+            return self.annotate(is_liked=Value(False))
+        return self.annotate(
+            is_liked=Exists(Like.objects.filter(
+                user=user, comment=OuterRef('pk')
+            ))
+        )
@@ -0,0 +1,49 @@
+from django.contrib.gis.db.models import Collect
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.gis.geos import Polygon
+from django.db.models import Count
+
+# Примерное число кластеров по ширине тайла карты
+CLUSTERS_PER_TILE = 4
+
+
+def get_grid_size(zoom):
+    """Размер ячейки сетки в градусах для уровня масштаба карты."""
+    return 360 / 2 ** zoom / CLUSTERS_PER_TILE
+
+
+def get_clusters(queryset, bbox, zoom):
+    """Группирует мероприятия в пределах bbox по ячейкам сетки.
+
+    Возвращает список кластеров с центроидом, количеством мероприятий
+    и самым частым видом активности."""
+    cell = SnapToGrid('location__point', get_grid_size(zoom))
+    queryset = queryset.filter(
+        location__point__within=Polygon.from_bbox(bbox)
+    ).order_by().annotate(cell=cell)
+
+    clusters = queryset.values('cell').annotate(
+        count=Count('id', distinct=True),
+        centroid=Centroid(Collect('location__point'))
+    )
+    activities = queryset.values('cell', 'activity__name').annotate(
+        count=Count('id', distinct=True)
+    )
+
+    dominant = {}
+    for row in activities:
+        key = row['cell'].wkt
+        if key not in dominant or row['count'] > dominant[key]['count']:
+            dominant[key] = row
+
+    return [
+        {
+            'latitude': cluster['centroid'].y,
+            'longitude': cluster['centroid'].x,
+            'count': cluster['count'],
+            'activity': dominant.get(
+                cluster['cell'].wkt, {}
+            ).get('activity__name')
+        }
+        for cluster in clusters
+    ]
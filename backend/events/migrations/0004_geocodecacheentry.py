@@ -0,0 +1,45 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0003_recommendation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodeCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=300, unique=True, verbose_name="Ключ запроса"
+                    ),
+                ),
+                ("address", models.CharField(max_length=256, verbose_name="Адрес")),
+                ("latitude", models.FloatField(verbose_name="Широта")),
+                ("longitude", models.FloatField(verbose_name="Долгота")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now=True, db_index=True, verbose_name="Дата запроса"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Результат геокодирования",
+                "verbose_name_plural": "Кеш геокодирования",
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0004_geocodecacheentry"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="location",
+            name="address",
+            field=models.CharField(blank=True, max_length=256, verbose_name="Адрес"),
+        ),
+        migrations.AlterField(
+            model_name="location",
+            name="point",
+            field=django.contrib.gis.db.models.fields.PointField(
+                null=True, srid=4326
+            ),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Ожидает геокодирования"),
+                    ("resolved", "Определено"),
+                    ("failed", "Не удалось определить"),
+                ],
+                default="resolved",
+                max_length=16,
+                verbose_name="Статус геокодирования",
+            ),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="raw_input",
+            field=models.CharField(
+                blank=True, max_length=256, verbose_name="Исходные данные"
+            ),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0, verbose_name="Попытки геокодирования"
+            ),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="next_attempt_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Следующая попытка"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="location",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["next_attempt_at"],
+                name="location_pending",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+import re
+
+from django.db import migrations, models
+
+
+def normalize_address(address):
+    """Копия events.utils.normalize_address на момент миграции,
+    чтобы последующие изменения функции не меняли ее результат."""
+    address = address.casefold().replace('ё', 'е')
+    address = re.sub(r'[^\w]+', ' ', address)
+    return ' '.join(address.split())
+
+
+def fill_normalized_address(apps, schema_editor):
+    Location = apps.get_model('events', 'Location')
+    locations = list(Location.objects.only('id', 'address'))
+    for location in locations:
+        location.normalized_address = normalize_address(location.address)
+    Location.objects.bulk_update(
+        locations, ['normalized_address'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0005_location_geocoding_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="location",
+            name="normalized_address",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                max_length=256,
+                verbose_name="Нормализованный адрес",
+            ),
+        ),
+        migrations.RunPython(fill_normalized_address, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0006_location_normalized_address"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["-datetime", "-id"], name="event_datetime_id"
+            ),
+        ),
+    ]
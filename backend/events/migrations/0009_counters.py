@@ -0,0 +1,88 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+# Общая триггерная функция счетчиков: TG_ARGV - таблица со счетчиком,
+# колонка счетчика и колонка связи со ссылкой на строку этой таблицы.
+COUNTER_FUNCTION = '''
+CREATE OR REPLACE FUNCTION adjust_counter() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+    delta integer;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        row_data := to_jsonb(NEW);
+        delta := 1;
+    ELSE
+        row_data := to_jsonb(OLD);
+        delta := -1;
+    END IF;
+    EXECUTE format(
+        'UPDATE %I SET %I = GREATEST(%I + $1, 0) WHERE id = $2',
+        TG_ARGV[0], TG_ARGV[1], TG_ARGV[1]
+    ) USING delta, (row_data ->> TG_ARGV[2])::bigint;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+COUNTER_TRIGGERS = '''
+CREATE TRIGGER participation_count
+AFTER INSERT OR DELETE ON events_participation
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('events_event', 'participants_count', 'event_id');
+
+CREATE TRIGGER like_count
+AFTER INSERT OR DELETE ON events_like
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('events_comment', 'likes_count', 'comment_id');
+'''
+
+DROP_COUNTER_TRIGGERS = '''
+DROP TRIGGER IF EXISTS participation_count ON events_participation;
+DROP TRIGGER IF EXISTS like_count ON events_like;
+'''
+
+FILL_COUNTERS = '''
+UPDATE events_event SET participants_count = (
+    SELECT COUNT(*) FROM events_participation
+    WHERE events_participation.event_id = events_event.id
+);
+UPDATE events_comment SET likes_count = (
+    SELECT COUNT(*) FROM events_like
+    WHERE events_like.comment_id = events_comment.id
+);
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0008_comment_event_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="participants_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество участников",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="likes_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество лайков",
+            ),
+        ),
+        migrations.RunSQL(
+            COUNTER_FUNCTION,
+            "DROP FUNCTION IF EXISTS adjust_counter();",
+        ),
+        migrations.RunSQL(COUNTER_TRIGGERS, DROP_COUNTER_TRIGGERS),
+        migrations.RunSQL(FILL_COUNTERS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# Любое изменение строки мероприятия или комментария, в том числе
+# счетчиков из триггеров adjust_counter, обновляет last_modified.
+TOUCH_FUNCTION = '''
+CREATE OR REPLACE FUNCTION touch_last_modified() RETURNS trigger AS $$
+BEGIN
+    NEW.last_modified := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+# Изменения связанных строк обновляют мероприятие по их event_id.
+TOUCH_EVENT_FUNCTION = '''
+CREATE OR REPLACE FUNCTION touch_event() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+    UPDATE events_event SET last_modified = clock_timestamp()
+    WHERE id = (row_data ->> 'event_id')::bigint;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+TOUCH_LOCATION_EVENTS_FUNCTION = '''
+CREATE OR REPLACE FUNCTION touch_location_events() RETURNS trigger AS $$
+BEGIN
+    UPDATE events_event SET last_modified = clock_timestamp()
+    WHERE location_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+TRIGGERS = '''
+CREATE TRIGGER event_last_modified
+BEFORE UPDATE ON events_event
+FOR EACH ROW EXECUTE FUNCTION touch_last_modified();
+
+CREATE TRIGGER comment_last_modified
+BEFORE UPDATE ON events_comment
+FOR EACH ROW EXECUTE FUNCTION touch_last_modified();
+
+CREATE TRIGGER comment_touch_event
+AFTER INSERT OR UPDATE OR DELETE ON events_comment
+FOR EACH ROW EXECUTE FUNCTION touch_event();
+
+CREATE TRIGGER activity_for_event_touch_event
+AFTER INSERT OR DELETE ON events_activityforevent
+FOR EACH ROW EXECUTE FUNCTION touch_event();
+
+CREATE TRIGGER favorite_touch_event
+AFTER INSERT OR DELETE ON events_favoriteevent
+FOR EACH ROW EXECUTE FUNCTION touch_event();
+
+CREATE TRIGGER location_touch_events
+AFTER UPDATE ON events_location
+FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE FUNCTION touch_location_events();
+'''
+
+DROP_TRIGGERS = '''
+DROP TRIGGER IF EXISTS event_last_modified ON events_event;
+DROP TRIGGER IF EXISTS comment_last_modified ON events_comment;
+DROP TRIGGER IF EXISTS comment_touch_event ON events_comment;
+DROP TRIGGER IF EXISTS activity_for_event_touch_event
+    ON events_activityforevent;
+DROP TRIGGER IF EXISTS favorite_touch_event ON events_favoriteevent;
+DROP TRIGGER IF EXISTS location_touch_events ON events_location;
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0009_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="last_modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата изменения",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="last_modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата изменения",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            TOUCH_FUNCTION,
+            "DROP FUNCTION IF EXISTS touch_last_modified();",
+        ),
+        migrations.RunSQL(
+            TOUCH_EVENT_FUNCTION,
+            "DROP FUNCTION IF EXISTS touch_event();",
+        ),
+        migrations.RunSQL(
+            TOUCH_LOCATION_EVENTS_FUNCTION,
+            "DROP FUNCTION IF EXISTS touch_location_events();",
+        ),
+        migrations.RunSQL(TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Поисковый вектор пересчитывается при любом изменении названия
+# или описания: название весит больше описания.
+SEARCH_VECTOR_FUNCTION = '''
+CREATE OR REPLACE FUNCTION event_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(NEW.description, '')),
+                     'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+SEARCH_VECTOR_TRIGGER = '''
+CREATE TRIGGER event_search_vector
+BEFORE INSERT OR UPDATE OF name, description ON events_event
+FOR EACH ROW EXECUTE FUNCTION event_search_vector();
+'''
+
+FILL_SEARCH_VECTOR = '''
+UPDATE events_event SET
+    search_vector =
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(description, '')), 'B');
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0010_last_modified"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.RunSQL(
+            SEARCH_VECTOR_FUNCTION,
+            "DROP FUNCTION IF EXISTS event_search_vector();",
+        ),
+        migrations.RunSQL(
+            SEARCH_VECTOR_TRIGGER,
+            "DROP TRIGGER IF EXISTS event_search_vector ON events_event;",
+        ),
+        migrations.RunSQL(FILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="event_search_vector"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0011_event_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LoaderCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "dataset",
+                    models.CharField(
+                        max_length=300,
+                        unique=True,
+                        verbose_name="Файл набора данных",
+                    ),
+                ),
+                (
+                    "rows",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Загружено строк"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Прогресс загрузки",
+                "verbose_name_plural": "Прогресс загрузки",
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations
+
+# Удаление мероприятий не меняет MAX(last_modified) оставшихся строк,
+# по которому строится ETag списка. Триггер уровня оператора обновляет
+# last_modified последнего измененного мероприятия, чтобы максимум вырос.
+TOUCH_ON_DELETE_FUNCTION = '''
+CREATE OR REPLACE FUNCTION touch_latest_event() RETURNS trigger AS $$
+BEGIN
+    UPDATE events_event SET last_modified = clock_timestamp()
+    WHERE id = (
+        SELECT id FROM events_event ORDER BY last_modified DESC LIMIT 1
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+TRIGGER = '''
+CREATE TRIGGER event_delete_touch
+AFTER DELETE ON events_event
+FOR EACH STATEMENT EXECUTE FUNCTION touch_latest_event();
+'''
+
+DROP_TRIGGER = '''
+DROP TRIGGER IF EXISTS event_delete_touch ON events_event;
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0012_loadercheckpoint"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            TOUCH_ON_DELETE_FUNCTION,
+            "DROP FUNCTION IF EXISTS touch_latest_event();",
+        ),
+        migrations.RunSQL(TRIGGER, DROP_TRIGGER),
+    ]
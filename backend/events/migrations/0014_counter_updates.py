@@ -0,0 +1,97 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations
+
+# Перенос строки связи на другой объект (UPDATE колонки связи)
+# уменьшает счетчик прежнего объекта и увеличивает счетчик нового.
+COUNTER_FUNCTION = '''
+CREATE OR REPLACE FUNCTION adjust_counter() RETURNS trigger AS $$
+DECLARE
+    update_sql text := format(
+        'UPDATE %I SET %I = GREATEST(%I + $1, 0) WHERE id = $2',
+        TG_ARGV[0], TG_ARGV[1], TG_ARGV[1]
+    );
+    old_id bigint;
+    new_id bigint;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        old_id := (to_jsonb(OLD) ->> TG_ARGV[2])::bigint;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        new_id := (to_jsonb(NEW) ->> TG_ARGV[2])::bigint;
+    END IF;
+    IF old_id IS NOT DISTINCT FROM new_id THEN
+        RETURN NULL;
+    END IF;
+    IF old_id IS NOT NULL THEN
+        EXECUTE update_sql USING -1, old_id;
+    END IF;
+    IF new_id IS NOT NULL THEN
+        EXECUTE update_sql USING 1, new_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+# Функция из 0009_counters
+OLD_COUNTER_FUNCTION = '''
+CREATE OR REPLACE FUNCTION adjust_counter() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+    delta integer;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        row_data := to_jsonb(NEW);
+        delta := 1;
+    ELSE
+        row_data := to_jsonb(OLD);
+        delta := -1;
+    END IF;
+    EXECUTE format(
+        'UPDATE %I SET %I = GREATEST(%I + $1, 0) WHERE id = $2',
+        TG_ARGV[0], TG_ARGV[1], TG_ARGV[1]
+    ) USING delta, (row_data ->> TG_ARGV[2])::bigint;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+COUNTER_TRIGGERS = '''
+DROP TRIGGER IF EXISTS participation_count ON events_participation;
+CREATE TRIGGER participation_count
+AFTER INSERT OR DELETE OR UPDATE OF event_id ON events_participation
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('events_event', 'participants_count', 'event_id');
+
+DROP TRIGGER IF EXISTS like_count ON events_like;
+CREATE TRIGGER like_count
+AFTER INSERT OR DELETE OR UPDATE OF comment_id ON events_like
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('events_comment', 'likes_count', 'comment_id');
+'''
+
+OLD_COUNTER_TRIGGERS = '''
+DROP TRIGGER IF EXISTS participation_count ON events_participation;
+CREATE TRIGGER participation_count
+AFTER INSERT OR DELETE ON events_participation
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('events_event', 'participants_count', 'event_id');
+
+DROP TRIGGER IF EXISTS like_count ON events_like;
+CREATE TRIGGER like_count
+AFTER INSERT OR DELETE ON events_like
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('events_comment', 'likes_count', 'comment_id');
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("events", "0013_event_delete_touch"),
+    ]
+
+    operations = [
+        migrations.RunSQL(COUNTER_FUNCTION, OLD_COUNTER_FUNCTION),
+        migrations.RunSQL(COUNTER_TRIGGERS, OLD_COUNTER_TRIGGERS),
+    ]
@@ -1,7 +1,13 @@
 from django.conf import settings
 from django.contrib.gis.db import models as gismodels
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
+from .counters import CounterFieldsMixin
+from .managers import CommentQuerySet, EventQuerySet
+from .utils import normalize_address
+
 
 class Activity(models.Model):
     """Модель видов спорта."""
@@ -22,23 +28,69 @@ class Activity(models.Model):
 
 class Location(gismodels.Model):
     """Модель локации мероприятия."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Ожидает геокодирования'
+        RESOLVED = 'resolved', 'Определено'
+        FAILED = 'failed', 'Не удалось определить'
+
     address = models.CharField(
         verbose_name='Адрес',
-        max_length=256
+        max_length=256,
+        blank=True
+    )
+    normalized_address = models.CharField(
+        verbose_name='Нормализованный адрес',
+        max_length=256,
+        blank=True,
+        db_index=True
+    )
+    point = gismodels.PointField(spatial_index=True, null=True)
+    status = models.CharField(
+        verbose_name='Статус геокодирования',
+        max_length=16,
+        choices=Status.choices,
+        default=Status.RESOLVED
+    )
+    raw_input = models.CharField(
+        verbose_name='Исходные данные',
+        max_length=256,
+        blank=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попытки геокодирования',
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Следующая попытка',
+        null=True,
+        blank=True
     )
-    point = gismodels.PointField(spatial_index=True)
 
     class Meta:
         ordering = ['address']
         verbose_name = 'Место проведения'
         verbose_name_plural = 'Места проведения'
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='location_pending'
+            )
+        ]
 
     def __str__(self):
-        return self.address
+        return self.address or self.raw_input
+
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
 
 
-class Event(models.Model):
+class Event(CounterFieldsMixin, models.Model):
     """Модель публикаций о мероприятиях."""
+    counter_fields = ('participants_count',)
+
     name = models.CharField(
         verbose_name='Название мероприятия',
         max_length=124
@@ -65,11 +117,35 @@ class Event(models.Model):
         related_name='events',
         on_delete=models.CASCADE
     )
+    participants_count = models.PositiveIntegerField(
+        verbose_name='Количество участников',
+        default=0,
+        editable=False
+    )
+    last_modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = EventQuerySet.as_manager()
 
     class Meta:
         ordering = ['-datetime']
         verbose_name = 'Мероприятие'
         verbose_name_plural = 'Мероприятия'
+        indexes = [
+            models.Index(
+                fields=['-datetime', '-id'],
+                name='event_datetime_id'
+            ),
+            GinIndex(fields=['search_vector'], name='event_search_vector')
+        ]
 
     def __str__(self):
         return self.name
@@ -101,8 +177,10 @@ class ActivityForEvent(models.Model):
         return f'{self.event}: {self.activity}'
 
 
-class Comment(models.Model):
+class Comment(CounterFieldsMixin, models.Model):
     """Модель комментария к отзыву."""
+    counter_fields = ('likes_count',)
+
     event = models.ForeignKey(
         Event,
         verbose_name='Комментарий к посту',
@@ -126,11 +204,29 @@ class Comment(models.Model):
         through='Like',
         verbose_name='Лайки'
     )
+    likes_count = models.PositiveIntegerField(
+        verbose_name='Количество лайков',
+        default=0,
+        editable=False
+    )
+    last_modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['event', '-id'],
+                name='comment_event_id'
+            )
+        ]
 
     def __str__(self):
         return self.text
@@ -222,3 +318,94 @@ class Like(models.Model):
     def __str__(self):
         return (f'Пользователь {self.user.username} оценил комментарий'
                 f'{self.comment}')
+
+
+class Recommendation(models.Model):
+    """Модель рекомендованных пользователю мероприятий.
+
+    Таблица поддерживается инкрементально сигналами из events.signals
+    и полностью перестраивается командой rebuild_recommendations."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name='Пользователь',
+        related_name='recommendations',
+        on_delete=models.CASCADE
+    )
+    event = models.ForeignKey(
+        Event,
+        verbose_name='Мероприятие',
+        related_name='recommendations_for_event',
+        on_delete=models.CASCADE
+    )
+    score = models.PositiveIntegerField(
+        verbose_name='Количество совпавших видов активности'
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'event'],
+                name='unique_recommendation'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='recommendation_user_score'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.event} ({self.score})'
+
+
+class GeocodeCacheEntry(models.Model):
+    """Модель закешированных результатов геокодирования."""
+    key = models.CharField(
+        verbose_name='Ключ запроса',
+        max_length=300,
+        unique=True
+    )
+    address = models.CharField(
+        verbose_name='Адрес',
+        max_length=256
+    )
+    latitude = models.FloatField(verbose_name='Широта')
+    longitude = models.FloatField(verbose_name='Долгота')
+    created_at = models.DateTimeField(
+        verbose_name='Дата запроса',
+        auto_now=True,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Результат геокодирования'
+        verbose_name_plural = 'Кеш геокодирования'
+
+    def __str__(self):
+        return f'{self.key}: {self.address}'
+
+
+class LoaderCheckpoint(models.Model):
+    """Модель прогресса загрузки файла командой dataloader.
+
+    Количество загруженных строк сохраняется в одной транзакции
+    с пачкой строк, поэтому --resume не пропускает и не повторяет их."""
+    dataset = models.CharField(
+        verbose_name='Файл набора данных',
+        max_length=300,
+        unique=True
+    )
+    rows = models.PositiveBigIntegerField(
+        verbose_name='Загружено строк',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Прогресс загрузки'
+        verbose_name_plural = 'Прогресс загрузки'
+
+    def __str__(self):
+        return f'{self.dataset}: {self.rows}'
@@ -1,6 +1,166 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPaginator(PageNumberPagination):
     """Кастомный пагинатор для вывода определенного количества объектов."""
     page_size = 10
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу сортировки (cursor) без COUNT и OFFSET.
+
+    Все поля `ordering` сортируются по убыванию, последнее поле
+    должно быть уникальным. Курсор непрозрачен для клиента и хранит
+    значения ключа граничного объекта и направление перехода."""
+    page_size = 10
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def get_fields(self, queryset):
+        return [
+            queryset.model._meta.get_field(name.lstrip('-'))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({'p': position, 'r': int(reverse)})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(data['p']) != len(fields):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(fields, data['p'])
+            ]
+            return position, bool(data['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_filter(self, fields, position, lookup):
+        """Условие 'ключ строго меньше (lt) или больше (gt) position'
+        в лексикографическом порядке полей."""
+        condition = Q()
+        for index, field in enumerate(fields):
+            equal = {
+                fields[previous].attname: position[previous]
+                for previous in range(index)
+            }
+            condition |= Q(
+                **equal, **{f'{field.attname}__{lookup}': position[index]}
+            )
+        return condition
+
+    def get_position(self, obj):
+        return [field.value_to_string(obj) for field in self.fields]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fields = self.get_fields(queryset)
+        position, reverse = self.decode_cursor(request, self.fields)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(
+                self.fields, position, 'gt' if reverse else 'lt'
+            ))
+        ordering = [field.attname for field in self.fields] if reverse else [
+            f'-{field.attname}' for field in self.fields
+        ]
+        results = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next_cursor = (
+            self.encode_cursor(self.get_position(results[-1]), False)
+            if has_next and results else None
+        )
+        self.previous_cursor = (
+            self.encode_cursor(self.get_position(results[0]), True)
+            if has_previous and results else None
+        )
+        return results
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+            'results': data
+        })
+
+
+class EventKeysetPagination(KeysetPagination):
+    """Курсорная пагинация ленты мероприятий в порядке Event.Meta."""
+    ordering = ('-datetime', '-id')
+
+
+class SwitchablePagination(BasePagination):
+    """Пагинация с выбором режима по параметрам запроса.
+
+    По умолчанию - постраничная. С параметром ?pagination=cursor,
+    при переходе по курсору или с одним из `keyset_query_params` -
+    курсорная, если запрос не задает собственную сортировку."""
+    mode_query_param = 'pagination'
+    keyset_query_params = ()
+    page_number_class = PageNumberPagination
+    keyset_class = KeysetPagination
+
+    def __init__(self):
+        self.page_number = self.page_number_class()
+        self.keyset = self.keyset_class()
+        self.active = self.page_number
+
+    def use_keyset(self, queryset, request):
+        params = request.query_params
+        requested = (
+            params.get(self.mode_query_param) == 'cursor'
+            or self.keyset.cursor_query_param in params
+            or any(param in params for param in self.keyset_query_params)
+        )
+        return requested and not queryset.query.order_by
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(queryset, request):
+            self.active = self.keyset
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+
+class EventPagination(SwitchablePagination):
+    """Пагинация ленты мероприятий: постраничная или курсорная
+    по (-datetime, -id). Запросы с ?near= и ?travel_from= задают
+    собственную сортировку и остаются постраничными."""
+    keyset_class = EventKeysetPagination
+
+
+class CommentPagination(SwitchablePagination):
+    """Пагинация комментариев: постраничная или курсорная по -id.
+
+    Запросы с ?after_id= или ?before_id= всегда курсорные, поэтому
+    опрос новых комментариев обходится без COUNT."""
+    keyset_query_params = ('after_id', 'before_id')
+    page_number_class = CustomPaginator
@@ -0,0 +1,77 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from users.models import FavoriteActivity
+
+from .models import (ActivityForEvent,
+                     Event,
+                     Participation,
+                     Recommendation)
+
+REFRESH_SQL = '''
+    INSERT INTO {recommendation} (user_id, event_id, score)
+    SELECT favorite.user_id, activity.event_id, COUNT(*)
+    FROM {favorite} AS favorite
+    JOIN {activity} AS activity
+        ON activity.activity_id = favorite.activity_id
+    JOIN {event} AS event
+        ON event.id = activity.event_id
+    WHERE event.datetime > %s
+        AND NOT EXISTS (
+            SELECT 1 FROM {participation} AS participation
+            WHERE participation.user_id = favorite.user_id
+                AND participation.event_id = activity.event_id
+        )
+        {filters}
+    GROUP BY favorite.user_id, activity.event_id
+    ON CONFLICT (user_id, event_id) DO UPDATE SET score = EXCLUDED.score
+'''
+
+
+def refresh_recommendations(users=None, events=None):
+    """Пересчитывает рекомендации для переданных пользователей
+    и/или мероприятий.
+
+    Если не передано ни одного ограничения, пересчитывается вся таблица."""
+    if users is not None and not users:
+        return
+    if events is not None and not events:
+        return
+
+    lookups = {}
+    filters = []
+    params = [timezone.now()]
+    if users is not None:
+        users = list(users)
+        lookups['user__in'] = users
+        filters.append('AND favorite.user_id = ANY(%s)')
+        params.append(users)
+    if events is not None:
+        events = list(events)
+        lookups['event__in'] = events
+        filters.append('AND activity.event_id = ANY(%s)')
+        params.append(events)
+
+    sql = REFRESH_SQL.format(
+        recommendation=Recommendation._meta.db_table,
+        favorite=FavoriteActivity._meta.db_table,
+        activity=ActivityForEvent._meta.db_table,
+        event=Event._meta.db_table,
+        participation=Participation._meta.db_table,
+        filters='\n        '.join(filters)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        Recommendation.objects.filter(**lookups).delete()
+        cursor.execute(sql, params)
+
+
+def get_recommended_events(user):
+    """Возвращает предстоящие рекомендованные пользователю мероприятия.
+
+    Мероприятия ранжируются по количеству совпавших видов активности,
+    затем по близости даты проведения. Выборка читается из таблицы
+    Recommendation по индексу (user, -score)."""
+    return Event.objects.filter(
+        recommendations_for_event__user=user,
+        datetime__gt=timezone.now()
+    ).order_by('-recommendations_for_event__score', 'datetime', 'id')
@@ -0,0 +1,360 @@
+import heapq
+import math
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.core.cache import cache
+
+from .contraction import ContractionHierarchy
+
+EARTH_RADIUS = 6371008.8
+
+# Размер ячейки сетки для поиска ближайшего узла графа, градусы
+GRID_CELL = 0.005
+
+# Множитель ключа ячейки: строка * GRID_ROW + столбец
+GRID_ROW = 1_000_000
+
+GRAPH_ARRAYS = ('node_lat',
+                'node_lon',
+                'indptr',
+                'indices',
+                'weights',
+                'grid_keys',
+                'grid_order')
+
+
+class GraphUnavailable(Exception):
+    """Граф улиц не построен или не найден."""
+
+
+class NoRoute(Exception):
+    """Между точками нет маршрута."""
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Расстояние по дуге большого круга в метрах.
+
+    Принимает как числа, так и массивы numpy."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def point_distance(lat1, lon1, lat2, lon2):
+    """То же, что haversine, для одиночных координат без numpy."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2)
+         * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def grid_keys(lat, lon):
+    """Ключи ячеек сетки для координат."""
+    rows = np.floor((np.asarray(lat) + 90) / GRID_CELL).astype(np.int64)
+    cols = np.floor((np.asarray(lon) + 180) / GRID_CELL).astype(np.int64)
+    return rows * GRID_ROW + cols
+
+
+def save_street_graph(path, node_lat, node_lon, edges):
+    """Сохраняет граф улиц в каталог `path` набором .npy-массивов.
+
+    `edges` - итерируемое из (u, v, длина в метрах) с индексами узлов.
+    Параллельные ребра схлопываются до самого короткого, смежность
+    хранится в формате CSR."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    node_lat = np.asarray(node_lat, dtype=np.float64)
+    node_lon = np.asarray(node_lon, dtype=np.float64)
+
+    shortest = {}
+    for u, v, length in edges:
+        if u != v and length < shortest.get((u, v), math.inf):
+            shortest[(u, v)] = length
+    sources = np.fromiter((u for u, _ in shortest), dtype=np.int64,
+                          count=len(shortest))
+    targets = np.fromiter((v for _, v in shortest), dtype=np.int32,
+                          count=len(shortest))
+    weights = np.fromiter(shortest.values(), dtype=np.float32,
+                          count=len(shortest))
+    order = np.argsort(sources, kind='stable')
+    indptr = np.zeros(len(node_lat) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(node_lat)), out=indptr[1:])
+
+    keys = grid_keys(node_lat, node_lon)
+    grid_order = np.argsort(keys, kind='stable').astype(np.int32)
+
+    arrays = {
+        'node_lat': node_lat,
+        'node_lon': node_lon,
+        'indptr': indptr,
+        'indices': targets[order],
+        'weights': weights[order],
+        'grid_keys': keys[grid_order],
+        'grid_order': grid_order,
+    }
+    for name, array in arrays.items():
+        np.save(path / f'{name}.npy', array)
+
+
+class StreetGraph:
+    """Граф улиц в виде CSR-массивов, отображенных в память.
+
+    Массивы загружаются через mmap, поэтому воркеры стартуют быстро
+    и разделяют страницы файла через page cache."""
+
+    def __init__(self, path):
+        path = Path(path)
+        for name in GRAPH_ARRAYS:
+            file = path / f'{name}.npy'
+            if not file.exists():
+                raise GraphUnavailable(f'{file} not found')
+            setattr(self, name, np.load(file, mmap_mode='r'))
+        self.path = path
+        self.hierarchy = ContractionHierarchy.load(path)
+
+    def __len__(self):
+        return len(self.node_lat)
+
+    def neighbors(self, node):
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return zip(self.indices[start:end].tolist(),
+                   self.weights[start:end].tolist())
+
+    def coordinates(self, node):
+        return float(self.node_lat[node]), float(self.node_lon[node])
+
+    def nearest_node(self, lat, lon, rings=2):
+        """Ближайший к точке узел графа.
+
+        Ищет по ячейкам сетки вокруг точки, при неудаче - по всем узлам."""
+        center = int(grid_keys(lat, lon))
+        candidates = []
+        for row in range(-rings, rings + 1):
+            for col in range(-rings, rings + 1):
+                key = center + row * GRID_ROW + col
+                start = np.searchsorted(self.grid_keys, key, side='left')
+                end = np.searchsorted(self.grid_keys, key, side='right')
+                candidates.append(self.grid_order[start:end])
+        candidates = np.concatenate(candidates)
+        if not len(candidates):
+            candidates = np.arange(len(self))
+        distances = haversine(lat, lon,
+                              self.node_lat[candidates],
+                              self.node_lon[candidates])
+        return int(candidates[np.argmin(distances)])
+
+    def shortest_path(self, source, target):
+        """Кратчайший путь: по иерархии сжатия, если она построена
+        командой build_contraction_hierarchy, иначе A*.
+
+        Возвращает (длина в метрах, список узлов)."""
+        if self.hierarchy is None:
+            return self.astar(source, target)
+        route = self.hierarchy.route(source, target)
+        if route is None:
+            raise NoRoute
+        return route
+
+    def astar(self, source, target):
+        """Кратчайший путь A* с эвристикой расстояния по прямой.
+
+        Возвращает (длина в метрах, список узлов)."""
+        target_lat, target_lon = self.coordinates(target)
+
+        def heuristic(node):
+            lat, lon = self.coordinates(node)
+            return point_distance(lat, lon, target_lat, target_lon)
+
+        distances = {source: 0.0}
+        parents = {source: None}
+        queue = [(heuristic(source), 0.0, source)]
+        settled = set()
+        while queue:
+            _, distance, node = heapq.heappop(queue)
+            if node == target:
+                return distance, self.unwind(parents, target)
+            if node in settled:
+                continue
+            settled.add(node)
+            for neighbor, weight in self.neighbors(node):
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    parents[neighbor] = node
+                    heapq.heappush(
+                        queue,
+                        (candidate + heuristic(neighbor), candidate, neighbor)
+                    )
+        raise NoRoute
+
+    def dijkstra(self, source, targets=None, cutoff=math.inf,
+                 max_settled=None):
+        """Кратчайшие расстояния от `source` до всех узлов не дальше
+        `cutoff` метров.
+
+        Если переданы `targets`, поиск останавливается, как только все они
+        достигнуты. `max_settled` ограничивает число обработанных узлов.
+        Возвращает словарь {узел: расстояние в метрах}."""
+        remaining = set(targets) if targets is not None else None
+        settled = {}
+        queue = [(0.0, source)]
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            if distance > cutoff:
+                break
+            settled[node] = distance
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            if max_settled is not None and len(settled) >= max_settled:
+                break
+            for neighbor, weight in self.neighbors(node):
+                if neighbor not in settled:
+                    heapq.heappush(queue, (distance + weight, neighbor))
+        return settled
+
+    @staticmethod
+    def unwind(parents, node):
+        path = []
+        while node is not None:
+            path.append(node)
+            node = parents[node]
+        return path[::-1]
+
+    def geometry(self, path):
+        """Координаты пути в формате GeoJSON LineString."""
+        return {
+            'type': 'LineString',
+            'coordinates': [
+                [float(self.node_lon[node]), float(self.node_lat[node])]
+                for node in path
+            ]
+        }
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_street_graph():
+    """Возвращает граф улиц, загружаемый один раз на процесс
+    из каталога settings.ROUTING_GRAPH_DIR."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = StreetGraph(settings.ROUTING_GRAPH_DIR)
+    return _graph
+
+
+def get_speed(mode):
+    """Скорость передвижения в м/с для способа передвижения."""
+    return settings.ROUTING_SPEEDS[mode] * 1000 / 3600
+
+
+def build_route(origin, destination, mode):
+    """Маршрут между точками (широта, долгота).
+
+    Возвращает словарь с геометрией, длиной в метрах и временем в пути
+    в секундах."""
+    graph = get_street_graph()
+    source = graph.nearest_node(*origin)
+    target = graph.nearest_node(*destination)
+    distance, path = graph.shortest_path(source, target)
+    return {
+        'geometry': graph.geometry(path),
+        'distance': round(distance),
+        'eta': round(distance / get_speed(mode))
+    }
+
+
+def travel_times(origin, destinations, mode, max_time):
+    """Время в пути в секундах от точки `origin` до каждой точки
+    из `destinations` за один проход Дейкстры.
+
+    Точки задаются кортежами (широта, долгота). Для недостижимых
+    за `max_time` секунд точек возвращается None."""
+    graph = get_street_graph()
+    speed = get_speed(mode)
+    source = graph.nearest_node(*origin)
+    targets = [graph.nearest_node(*point) for point in destinations]
+    distances = graph.dijkstra(
+        source,
+        targets=targets,
+        cutoff=max_time * speed,
+        max_settled=settings.ROUTING_MAX_SETTLED_NODES
+    )
+    return [
+        round(distances[target] / speed) if target in distances else None
+        for target in targets
+    ]
+
+
+def cell_runs(rows, cols):
+    """Склеивает соседние ячейки одной строки сетки.
+
+    Возвращает список (строка, первый столбец, последний столбец)."""
+    row_cols = {}
+    for row, col in zip(rows, cols):
+        row_cols.setdefault(row, set()).add(col)
+    runs = []
+    for row, columns in sorted(row_cols.items()):
+        columns = sorted(columns)
+        first = last = columns[0]
+        for col in columns[1:]:
+            if col != last + 1:
+                runs.append((row, first, last))
+                first = col
+            last = col
+        runs.append((row, first, last))
+    return runs
+
+
+def cells_to_region(rows, cols, cell):
+    """Объединяет ячейки сетки размером `cell` градусов в мультиполигон."""
+    rectangles = [
+        Polygon.from_bbox((first * cell - 180, row * cell - 90,
+                           (last + 1) * cell - 180, (row + 1) * cell - 90))
+        for row, first, last in cell_runs(rows, cols)
+    ]
+    region = MultiPolygon(*rectangles).unary_union
+    region.srid = 4326
+    return region
+
+
+def get_isochrone(origin, mode, max_time):
+    """Область, достижимая из точки `origin` за `max_time` секунд.
+
+    Область собирается из ячеек сетки settings.ISOCHRONE_CELL,
+    в которые попали достигнутые узлы графа. Результат кешируется
+    для ячейки исходной точки."""
+    precision = settings.ISOCHRONE_ORIGIN_PRECISION
+    origin = (round(origin[0], precision), round(origin[1], precision))
+    key = f'isochrone:{mode}:{max_time}:{origin[0]}:{origin[1]}'
+    region = cache.get(key)
+    if region is not None:
+        return GEOSGeometry(memoryview(region), srid=4326)
+
+    graph = get_street_graph()
+    speed = get_speed(mode)
+    reached = graph.dijkstra(
+        graph.nearest_node(*origin),
+        cutoff=max_time * speed,
+        max_settled=settings.ROUTING_MAX_SETTLED_NODES
+    )
+    nodes = np.fromiter(reached, dtype=np.int64, count=len(reached))
+    cell = settings.ISOCHRONE_CELL
+    rows = np.floor((graph.node_lat[nodes] + 90) / cell).astype(np.int64)
+    cols = np.floor((graph.node_lon[nodes] + 180) / cell).astype(np.int64)
+    region = cells_to_region(rows.tolist(), cols.tolist(), cell)
+    cache.set(key, bytes(region.wkb), settings.ISOCHRONE_CACHE_TIMEOUT)
+    return region
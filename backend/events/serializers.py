@@ -1,7 +1,6 @@
 from django.db import transaction
 from django.conf import settings
-
-from geopy import Yandex
+from django.utils import timezone
 
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
@@ -12,6 +11,11 @@ from .models import (Activity,
                      Location,
                      Participation)
 
+from .catalog import get_catalog
+from .geocoding import get_geocoder
+from .locations import get_or_create_location
+from .utils import parse_point
+
 from users.serializers import CustomUserContextSerializer
 
 
@@ -29,7 +33,8 @@ class LocationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Location
-        fields = ('id', 'address', 'point')
+        fields = ('id', 'address', 'point', 'status')
+        read_only_fields = ('status',)
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -40,7 +45,7 @@ class CommentSerializer(serializers.ModelSerializer):
     pub_date = serializers.DateTimeField(read_only=True, format='%d.%m.%Y')
     event = serializers.PrimaryKeyRelatedField(read_only=True)
     is_liked = serializers.SerializerMethodField()
-    likes_count = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Comment
@@ -59,21 +64,53 @@ class CommentSerializer(serializers.ModelSerializer):
         return instance
 
     def get_is_liked(self, comment):
+        if hasattr(comment, 'is_liked'):
+            return comment.is_liked
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return comment.users_for_liked_comment.filter(user=user).exists()
 
-    def get_likes_count(self, comment):
-        return comment.users_for_liked_comment.all().count()
+
+class ActivityField(serializers.PrimaryKeyRelatedField):
+    """Вид активности по id, проверяемый по каталогу в памяти
+    без запроса к БД."""
+    default_error_messages = {
+        'does_not_exist': 'Такого вида активности не существует.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Activity.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        activity = get_catalog().get(pk)
+        if activity is None:
+            self.fail('does_not_exist', pk_value=data)
+        return activity
+
+
+class BulkRelationSerializer(serializers.Serializer):
+    """Сериализатор массового добавления или удаления мероприятий
+    в избранное и в список участия."""
+    events = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
+    operation = serializers.ChoiceField(choices=('add', 'remove'))
 
 
 class EventSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и обновления постов о мероприятиях."""
     name = serializers.CharField(required=True)
-    activity = serializers.PrimaryKeyRelatedField(
-        queryset=Activity.objects.all(), many=True
-    )
+    activity = ActivityField(many=True)
     datetime = serializers.DateTimeField(format='%d.%m.%Y')
     author = CustomUserContextSerializer(
         default=serializers.CurrentUserDefault()
@@ -83,7 +120,9 @@ class EventSerializer(serializers.ModelSerializer):
     is_favorite = serializers.SerializerMethodField()
     is_participate = serializers.SerializerMethodField()
     comments = serializers.SerializerMethodField()
-    participants_count = serializers.SerializerMethodField()
+    participants_count = serializers.IntegerField(read_only=True)
+    distance = serializers.SerializerMethodField()
+    travel_time = serializers.SerializerMethodField()
 
     class Meta:
         model = Event
@@ -98,27 +137,63 @@ class EventSerializer(serializers.ModelSerializer):
                   'comments',
                   'is_favorite',
                   'is_participate',
-                  'participants_count')
+                  'participants_count',
+                  'distance',
+                  'travel_time')
 
     def get_location(self, location):
+        geocoder = get_geocoder()
         if location.get('address'):
-            location_data = Yandex(
-                api_key=settings.API_KEY
-            ).geocode(location['address'])
-            location['address'] = location_data.address
-            location['point'] = f'POINT({location_data.longitude} {location_data.latitude})'
+            location_data = geocoder.geocode(location['address'])
+            if location_data is not None:
+                location['point'] = (f'POINT({location_data.longitude} '
+                                     f'{location_data.latitude})')
 
         elif location.get('point'):
-            point = location.get('point')
-            location_data = Yandex(
-                api_key=settings.API_KEY
-            ).reverse(point)
+            try:
+                latitude, longitude = parse_point(location['point'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    'Некорректные координаты места проведения.'
+                )
+            location_data = geocoder.reverse(latitude, longitude)
+            location['point'] = f'POINT({longitude} {latitude})'
 
-            location['address'] = location_data.address
-            location['point'] = f'POINT({point})'
+        else:
+            raise serializers.ValidationError(
+                'Укажите адрес или координаты места проведения.'
+            )
 
+        if location_data is None:
+            raise serializers.ValidationError(
+                'Не удалось определить место проведения.'
+            )
+        location['address'] = location_data.address
         return location
 
+    def get_pending_location(self, location):
+        """Готовит локацию для отложенного геокодирования воркером."""
+        raw_input = location.get('address') or location.get('point')
+        if not raw_input:
+            raise serializers.ValidationError(
+                'Укажите адрес или координаты места проведения.'
+            )
+        pending_location = {
+            'address': location.get('address', ''),
+            'raw_input': raw_input,
+            'status': Location.Status.PENDING,
+            'next_attempt_at': timezone.now()
+        }
+        if not location.get('address'):
+            try:
+                latitude, longitude = parse_point(location['point'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    'Некорректные координаты места проведения.'
+                )
+            pending_location['point'] = f'POINT({longitude} {latitude})'
+        return pending_location
+
     def validate_name(self, value):
         if len(value) > 124:
             raise serializers.ValidationError(
@@ -134,18 +209,10 @@ class EventSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
-        activities_list = self.initial_data.get('activity')
-        if activities_list:
-            for elem_id in activities_list:
-                if not Activity.objects.filter(id=elem_id).exists():
-                    raise serializers.ValidationError(
-                        'Такого вида активности не существует.'
-                    )
-        else:
+        if not self.initial_data.get('activity'):
             raise serializers.ValidationError(
                 'Необходимо указать минимум один вид активности!'
             )
-
         return data
 
     @transaction.atomic
@@ -153,12 +220,17 @@ class EventSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         activity_list = validated_data.pop('activity')
         location = validated_data.pop('location')
-        location = self.get_location(location)
-        location = Location.objects.create(**location)
+        if settings.GEOCODING_ASYNC:
+            location = self.get_pending_location(location)
+        else:
+            location = self.get_location(location)
+        location = get_or_create_location(location)
 
         event = Event.objects.create(location=location, **validated_data)
         event.activity.set(activity_list)
         Participation.objects.create(event=event, user=user)
+        # Счетчик увеличен триггером в БД, а не в экземпляре
+        event.refresh_from_db(fields=['participants_count'])
         return event
 
     @transaction.atomic
@@ -171,25 +243,44 @@ class EventSerializer(serializers.ModelSerializer):
         return instance
 
     def get_is_favorite(self, event):
+        if hasattr(event, 'is_favorite'):
+            return event.is_favorite
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.favorite_for_user.filter(event=event).exists()
 
     def get_is_participate(self, event):
+        if hasattr(event, 'is_participate'):
+            return event.is_participate
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.events_participation_for_user.filter(event=event).exists()
 
-    def get_participants_count(self, event):
-        return event.users_participation_for_event.all().count()
+    def get_distance(self, event):
+        distance = getattr(event, 'distance', None)
+        if distance is None:
+            return None
+        return round(distance.m)
+
+    def get_travel_time(self, event):
+        return getattr(event, 'travel_time', None)
 
     def get_comments(self, event):
         request = self.context.get('request')
-        event = event.comments.all().order_by('-id')[:3]
+        if settings.COMMENTS_PREVIEW_SIZE <= 0:
+            return []
+        if hasattr(event, 'comments_preview'):
+            comments = event.comments_preview
+        else:
+            comments = event.comments.select_related(
+                'author'
+            ).with_user_data(request.user).order_by(
+                '-id'
+            )[:settings.COMMENTS_PREVIEW_SIZE]
         serializer = CommentSerializer(
-            event,
+            comments,
             context={'request': request},
             many=True
         )
@@ -197,6 +288,9 @@ class EventSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['activity'] = instance.activity.values()
+        data['activity'] = [
+            {'id': activity.id, 'name': activity.name}
+            for activity in instance.activity.all()
+        ]
         # data['location'] = instance.location.address
         return data
@@ -0,0 +1,138 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import FavoriteActivity
+from users.signals import relations_changed
+
+from .cache import invalidate_events
+from .catalog import invalidate_catalog
+from .models import (Activity,
+                     ActivityForEvent,
+                     Comment,
+                     Event,
+                     FavoriteEvent,
+                     Like,
+                     Location,
+                     Participation)
+from .recommendations import refresh_recommendations
+
+
+def schedule_refresh(users=None, events=None):
+    """Откладывает пересчет рекомендаций до фиксации транзакции,
+    чтобы каскадные удаления не оставляли ссылок на удаленные строки."""
+    transaction.on_commit(
+        partial(refresh_recommendations, users=users, events=events)
+    )
+
+
+def reverse_pk_set(sender, instance, action, pk_set, field):
+    """id объектов, затронутых изменением m2m со стороны Activity.
+
+    При clear() Django передает pk_set=None, поэтому id собираются
+    в pre_clear, пока связи еще существуют."""
+    cleared = f'_cleared_{sender._meta.model_name}'
+    if action == 'pre_clear':
+        setattr(instance, cleared, set(sender.objects.filter(
+            activity=instance
+        ).values_list(f'{field}_id', flat=True)))
+    elif action == 'post_clear':
+        return instance.__dict__.pop(cleared, set())
+    return pk_set
+
+
+@receiver(post_save, sender=FavoriteActivity)
+@receiver(post_delete, sender=FavoriteActivity)
+def favorite_activity_changed(sender, instance, **kwargs):
+    schedule_refresh(users=[instance.user_id])
+
+
+@receiver(m2m_changed, sender=FavoriteActivity)
+def user_activities_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    if reverse:
+        pk_set = reverse_pk_set(sender, instance, action, pk_set, 'user')
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    schedule_refresh(users=pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=ActivityForEvent)
+@receiver(post_delete, sender=ActivityForEvent)
+def activity_for_event_changed(sender, instance, **kwargs):
+    schedule_refresh(events=[instance.event_id])
+
+
+@receiver(m2m_changed, sender=ActivityForEvent)
+def event_activities_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if reverse:
+        pk_set = reverse_pk_set(sender, instance, action, pk_set, 'event')
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    events = pk_set if reverse else [instance.pk]
+    schedule_refresh(events=events)
+    invalidate_events(events)
+
+
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+def participation_changed(sender, instance, **kwargs):
+    schedule_refresh(users=[instance.user_id],
+                     events=[instance.event_id])
+
+
+@receiver(relations_changed, sender=Participation)
+def participations_changed(sender, user, pk_set, **kwargs):
+    schedule_refresh(users=[user.pk], events=pk_set)
+    invalidate_events(pk_set)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(events=[instance.pk])
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def event_changed(sender, instance, **kwargs):
+    invalidate_events([instance.pk])
+
+
+@receiver(post_save, sender=ActivityForEvent)
+@receiver(post_delete, sender=ActivityForEvent)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Participation)
+@receiver(post_delete, sender=Participation)
+@receiver(post_save, sender=FavoriteEvent)
+@receiver(post_delete, sender=FavoriteEvent)
+def event_relation_changed(sender, instance, **kwargs):
+    invalidate_events([instance.event_id])
+
+
+@receiver(relations_changed, sender=FavoriteEvent)
+def favorites_changed(sender, user, pk_set, **kwargs):
+    invalidate_events(pk_set)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def like_changed(sender, instance, **kwargs):
+    invalidate_events(Comment.objects.filter(
+        pk=instance.comment_id
+    ).values_list('event_id', flat=True))
+
+
+@receiver(post_save, sender=Location)
+def location_changed(sender, instance, **kwargs):
+    invalidate_events(instance.events.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Activity)
+@receiver(post_delete, sender=Activity)
+def activity_changed(sender, instance, **kwargs):
+    invalidate_catalog()
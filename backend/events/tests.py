@@ -0,0 +1,304 @@
+import heapq
+import math
+import random
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+import numpy as np
+from rest_framework.test import APIClient
+
+from .contraction import (ContractionHierarchy,
+                          build_contraction_hierarchy,
+                          save_contraction_hierarchy)
+from .counters import reconcile_counters
+from .models import Comment, Event, Like, Location, Participation
+from users.models import Subscribe
+
+
+def create_user(index):
+    return get_user_model().objects.create(
+        username=f'user_{index}',
+        email=f'user_{index}@example.com',
+        first_name='Имя',
+        last_name='Фамилия',
+        phone_number=f'+7900{index:07d}'
+    )
+
+
+def create_event(author, location=None, **fields):
+    if location is None:
+        location = Location.objects.create(
+            address='Москва, улица Тестовая, 1',
+            point=Point(37.6, 55.75, srid=4326)
+        )
+    fields.setdefault('datetime', timezone.now() + timedelta(days=1))
+    return Event.objects.create(name='Тренировка',
+                                description='Открытая тренировка',
+                                duration=60,
+                                author=author,
+                                location=location,
+                                **fields)
+
+
+class CounterFieldsTest(TestCase):
+    """Сохранение объекта не затирает счетчики из триггеров."""
+
+    def setUp(self):
+        self.author = create_user(1)
+        self.other = create_user(2)
+        self.event = create_event(self.author)
+        self.comment = Comment.objects.create(event=self.event,
+                                              author=self.author,
+                                              text='Комментарий')
+
+    def test_stale_instances_keep_counters(self):
+        event = Event.objects.get(pk=self.event.pk)
+        comment = Comment.objects.get(pk=self.comment.pk)
+        author = get_user_model().objects.get(pk=self.author.pk)
+        Participation.objects.create(event=self.event, user=self.other)
+        Like.objects.create(comment=self.comment, user=self.other)
+        Subscribe.objects.create(author=self.author, user=self.other)
+
+        event.name = 'Новое название'
+        event.save()
+        comment.text = 'Новый текст'
+        comment.save()
+        author.bio = 'О себе'
+        author.save()
+
+        event.refresh_from_db()
+        comment.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(event.name, 'Новое название')
+        self.assertEqual(event.participants_count, 1)
+        self.assertEqual(comment.likes_count, 1)
+        self.assertEqual(author.subscribers_count, 1)
+
+    def test_patch_comment_keeps_likes_count(self):
+        Like.objects.create(comment=self.comment, user=self.other)
+        client = APIClient()
+        client.force_authenticate(self.author)
+
+        response = client.patch(
+            f'/api/events/{self.event.pk}/comments/{self.comment.pk}/',
+            {'text': 'Исправленный текст'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.text, 'Исправленный текст')
+        self.assertEqual(self.comment.likes_count, 1)
+
+
+class CountersTest(TestCase):
+    """Триггеры поддерживают счетчики при создании, переносе
+    и удалении связей."""
+
+    def setUp(self):
+        self.author = create_user(1)
+        self.other_author = create_user(2)
+        self.user = create_user(3)
+        self.event = create_event(self.author)
+        self.other_event = create_event(self.other_author)
+        self.comment = Comment.objects.create(event=self.event,
+                                              author=self.author,
+                                              text='Комментарий')
+        self.other_comment = Comment.objects.create(event=self.event,
+                                                    author=self.author,
+                                                    text='Еще комментарий')
+
+    def assertCounters(self, field, objects, expected):
+        for obj, count in zip(objects, expected):
+            obj.refresh_from_db(fields=[field])
+            self.assertEqual(getattr(obj, field), count)
+
+    def check_relation(self, model, field, counter, first, second):
+        objects = (first, second)
+        relation = model.objects.create(user=self.user, **{field: first})
+        self.assertCounters(counter, objects, (1, 0))
+        setattr(relation, field, second)
+        relation.save()
+        self.assertCounters(counter, objects, (0, 1))
+        relation.delete()
+        self.assertCounters(counter, objects, (0, 0))
+        self.assertEqual(set(reconcile_counters().values()), {0})
+
+    def test_participants_count(self):
+        self.check_relation(Participation, 'event', 'participants_count',
+                            self.event, self.other_event)
+
+    def test_likes_count(self):
+        self.check_relation(Like, 'comment', 'likes_count',
+                            self.comment, self.other_comment)
+
+    def test_subscribers_count(self):
+        self.check_relation(Subscribe, 'author', 'subscribers_count',
+                            self.author, self.other_author)
+
+
+class RelationToggleTest(TestCase):
+    """Повторные добавление и удаление связи отвечают 400 и 404."""
+
+    def setUp(self):
+        self.author = create_user(1)
+        self.user = create_user(2)
+        self.event = create_event(self.author)
+        self.comment = Comment.objects.create(event=self.event,
+                                              author=self.author,
+                                              text='Комментарий')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def check_toggle(self, path, counter):
+        response = self.client.post(path)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data[counter], 1)
+        self.assertEqual(self.client.post(path).status_code, 400)
+        self.assertEqual(self.client.delete(path).status_code, 204)
+        self.assertEqual(self.client.delete(path).status_code, 404)
+
+    def test_participate(self):
+        self.check_toggle(f'/api/events/{self.event.pk}/participate/',
+                          'participants_count')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.participants_count, 0)
+
+    def test_like(self):
+        self.check_toggle(
+            f'/api/events/{self.event.pk}/comments/{self.comment.pk}/like/',
+            'likes_count'
+        )
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.likes_count, 0)
+
+    def test_missing_objects(self):
+        missing = self.event.pk + 1000
+        self.assertEqual(
+            self.client.post(f'/api/events/{missing}/participate/')
+            .status_code, 404
+        )
+        self.assertEqual(
+            self.client.post(
+                f'/api/events/{missing}/comments/{self.comment.pk}/like/'
+            ).status_code, 404
+        )
+
+
+class EventCursorPaginationTest(TestCase):
+    """Курсорная пагинация ленты не теряет и не повторяет мероприятия
+    с одинаковым временем проведения."""
+
+    def setUp(self):
+        self.user = create_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        location = Location.objects.create(
+            address='Москва, улица Тестовая, 1',
+            point=Point(37.6, 55.75, srid=4326)
+        )
+        moments = [timezone.now() + timedelta(days=day) for day in (1, 2)]
+        for index in range(25):
+            create_event(self.user, location, datetime=moments[index % 2])
+        self.expected = list(Event.objects.order_by(
+            '-datetime', '-id'
+        ).values_list('id', flat=True))
+
+    def walk(self, url, link):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = [event['id'] for event in response.data['results']]
+            pages.append(page)
+            ids.extend(page)
+            url = response.data[link]
+        return ids, pages
+
+    def test_forward_and_backward(self):
+        ids, pages = self.walk('/api/events/?pagination=cursor', 'next')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+
+        last = self.client.get('/api/events/?pagination=cursor')
+        while last.data['next']:
+            last = self.client.get(last.data['next'])
+        self.assertIsNone(last.data['next'])
+        _, back = self.walk(last.data['previous'], 'previous')
+        self.assertEqual([event for page in reversed(back) for event in page],
+                         self.expected[:20])
+
+
+def random_graph(rng, size, edges):
+    """Случайный ориентированный граф в формате CSR."""
+    rows = [[] for _ in range(size)]
+    for _ in range(edges):
+        source, target = rng.randrange(size), rng.randrange(size)
+        rows[source].append((target, rng.randint(1, 100)))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=indptr[1:])
+    indices = np.array([edge[0] for row in rows for edge in row],
+                       dtype=np.int32)
+    weights = np.array([edge[1] for row in rows for edge in row],
+                       dtype=np.float32)
+    return indptr, indices, weights
+
+
+def dijkstra(indptr, indices, weights, source):
+    distances = {source: 0.0}
+    queue = [(0.0, source)]
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]:
+            continue
+        for position in range(indptr[node], indptr[node + 1]):
+            neighbor = int(indices[position])
+            candidate = distance + float(weights[position])
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                heapq.heappush(queue, (candidate, neighbor))
+    return distances
+
+
+class ContractionHierarchyTest(SimpleTestCase):
+    """Маршруты по иерархии сжатия совпадают с обычной Дейкстрой."""
+
+    def test_routes_match_dijkstra(self):
+        rng = random.Random(7)
+        for size, edges in ((30, 60), (60, 240), (100, 300)):
+            indptr, indices, weights = random_graph(rng, size, edges)
+            graph = {}
+            for node in range(size):
+                for position in range(indptr[node], indptr[node + 1]):
+                    key = (node, int(indices[position]))
+                    graph[key] = min(graph.get(key, math.inf),
+                                     float(weights[position]))
+            with tempfile.TemporaryDirectory() as path:
+                save_contraction_hierarchy(
+                    path, build_contraction_hierarchy(indptr, indices,
+                                                      weights)
+                )
+                hierarchy = ContractionHierarchy.load(path)
+                for source in range(0, size, 3):
+                    expected = dijkstra(indptr, indices, weights, source)
+                    for target in range(size):
+                        route = hierarchy.route(source, target)
+                        if target not in expected:
+                            self.assertIsNone(route)
+                            continue
+                        distance, path_nodes = route
+                        self.assertAlmostEqual(distance, expected[target],
+                                               places=3)
+                        self.assertEqual(path_nodes[0], source)
+                        self.assertEqual(path_nodes[-1], target)
+                        self.assertAlmostEqual(
+                            sum(graph[edge] for edge
+                                in zip(path_nodes, path_nodes[1:])),
+                            distance,
+                            places=3
+                        )
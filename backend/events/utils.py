@@ -1,3 +1,8 @@
+import re
+
+from geopy.point import Point
+
+
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
@@ -5,3 +10,19 @@ def get_client_ip(request):
     else:
         ip = request.META.get('REMOTE_ADDR')
     return ip
+
+
+def parse_point(value):
+    """Разбирает строку координат вида 'широта, долгота'.
+
+    Возвращает кортеж (широта, долгота), при ошибке - ValueError."""
+    point = Point(value)
+    return point.latitude, point.longitude
+
+
+def normalize_address(address):
+    """Приводит адрес к виду для сравнения: нижний регистр, 'ё' -> 'е',
+    без знаков препинания и лишних пробелов."""
+    address = address.casefold().replace('ё', 'е')
+    address = re.sub(r'[^\w]+', ' ', address)
+    return ' '.join(address.split())
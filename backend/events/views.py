@@ -1,57 +1,145 @@
-import socket
-
+from django.conf import settings
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status, permissions
 from rest_framework.response import Response
 from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 
 from .models import (Activity,
+                     Comment,
                      Event,
                      FavoriteEvent,
                      Participation,
                      Like)
 
 from .serializers import (ActivitySerializer,
+                          BulkRelationSerializer,
                           EventSerializer,
                           CommentSerializer)
 
+from .cache import (cached_response,
+                    get_cache_key,
+                    get_cache_stats,
+                    get_versions)
+from .conditional import conditional_response, get_last_modified
 from .permissions import IsAdminAuthorOrReadOnly
-from .pagination import CustomPaginator
-from .filters import EventFilter, ActivityFilter
-from .utils import get_client_ip
-from users.utils import create_relation, delete_relation
+from .pagination import CommentPagination, EventPagination
+from .catalog import get_catalog
+from .filters import CommentFilter, EventFilter
+from .geocoding import get_geocoder
+from .maps import get_clusters
+from .routing import (GraphUnavailable,
+                      NoRoute,
+                      build_route,
+                      get_isochrone)
+from users.utils import bulk_relation, create_relation, delete_relation
 
 
 class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
-    """Вьюсет для просмотра видов активности."""
+    """Вьюсет для просмотра видов активности.
+
+    Ответы строятся по каталогу в памяти (events.catalog): ?name=
+    ищет по началу названия без учета регистра."""
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     pagination_class = None
     permission_classes = (permissions.AllowAny,)
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = ActivityFilter
+
+    def list(self, request, *args, **kwargs):
+        activities = get_catalog().search(
+            request.query_params.get('name', '')
+        )
+        return Response(self.get_serializer(activities, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            activity = get_catalog().get(int(kwargs['pk']))
+        except ValueError:
+            activity = None
+        if activity is None:
+            raise Http404
+        return Response(self.get_serializer(activity).data)
 
 
 class EventViewSet(viewsets.ModelViewSet):
     """Вьюсет для работы с постами мероприятий."""
-    queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = PageNumberPagination
+    pagination_class = EventPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = EventFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        return Event.objects.with_related().with_user_data(
+            user
+        ).with_comments_preview(user, settings.COMMENTS_PREVIEW_SIZE)
+
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'clusters', 'isochrone']:
             self.permission_classes = [permissions.AllowAny]
+        elif self.action == 'cache_stats':
+            self.permission_classes = [permissions.IsAdminUser]
         elif self.request.method in ['PATCH', 'DELETE']:
             self.permission_classes = [IsAdminAuthorOrReadOnly]
         else:
             self.permission_classes = [permissions.IsAuthenticated]
         return super().get_permissions()
 
+    def list(self, request, *args, **kwargs):
+        # Фильтры выполняются один раз и только при построении ответа:
+        # валидаторы от них не зависят
+        versions = get_versions()
+        validators = versions
+        if not request.user.is_anonymous:
+            # Версии в кеше процесса не видят изменений из других
+            # процессов, а время изменения в БД - общее для всех
+            validators = versions + [get_last_modified(Event.objects.all())]
+
+        def render():
+            if not request.user.is_anonymous:
+                return super(EventViewSet, self).list(
+                    request, *args, **kwargs
+                )
+            return cached_response(
+                get_cache_key(request,
+                              self.filterset_class.base_filters,
+                              versions),
+                lambda: super(EventViewSet, self).list(
+                    request, *args, **kwargs
+                )
+            )
+
+        return conditional_response(request, render, versions=validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        def render():
+            if not request.user.is_anonymous:
+                return super(EventViewSet, self).retrieve(
+                    request, *args, **kwargs
+                )
+            return cached_response(
+                get_cache_key(request,
+                              self.filterset_class.base_filters,
+                              get_versions(kwargs['pk'])),
+                lambda: super(EventViewSet, self).retrieve(
+                    request, *args, **kwargs
+                )
+            )
+
+        return conditional_response(
+            request,
+            render,
+            last_modified=get_last_modified(Event.objects.all(),
+                                            pk=kwargs['pk'])
+        )
+
+    @action(methods=['GET'], detail=False)
+    def cache_stats(self, request):
+        return Response({**get_cache_stats(),
+                         'geocoding': get_geocoder().get_stats()})
+
     @action(methods=['POST', 'DELETE'],
             detail=True,
             permission_classes=[permissions.IsAuthenticated, ])
@@ -61,7 +149,6 @@ class EventViewSet(viewsets.ModelViewSet):
                                    Event,
                                    FavoriteEvent,
                                    pk,
-                                   EventSerializer,
                                    'event')
         return delete_relation(request,
                                Event,
@@ -78,35 +165,151 @@ class EventViewSet(viewsets.ModelViewSet):
                                    Event,
                                    Participation,
                                    pk,
-                                   EventSerializer,
-                                   'event')
+                                   'event',
+                                   counter='participants_count')
         return delete_relation(request,
                                Event,
                                Participation,
                                pk,
-                               'event')
+                               'event',
+                               counter='participants_count')
+
+    def bulk_relation_response(self, request, model_relation):
+        serializer = BulkRelationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_relation(
+            request.user,
+            Event,
+            model_relation,
+            serializer.validated_data['events'],
+            'event',
+            add=serializer.validated_data['operation'] == 'add'
+        )
+        return Response({'results': results})
+
+    @action(methods=['POST'],
+            detail=False,
+            permission_classes=[permissions.IsAuthenticated, ])
+    def bulk_favorite(self, request):
+        return self.bulk_relation_response(request, FavoriteEvent)
+
+    @action(methods=['POST'],
+            detail=False,
+            permission_classes=[permissions.IsAuthenticated, ])
+    def bulk_participate(self, request):
+        return self.bulk_relation_response(request, Participation)
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=[permissions.AllowAny, ])
+    def clusters(self, request):
+        try:
+            bbox = [float(value) for value
+                    in request.query_params['bbox'].split(',')]
+            zoom = int(request.query_params['zoom'])
+        except (KeyError, ValueError):
+            return Response(
+                data={'errors': 'Укажите bbox=minlon,minlat,maxlon,maxlat '
+                                'и zoom'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(bbox) != 4 or not 0 <= zoom <= 22:
+            return Response(
+                data={'errors': 'Некорректные bbox или zoom'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        events = self.filter_queryset(Event.objects.all())
+        return Response(get_clusters(events, bbox, zoom))
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=[permissions.AllowAny, ])
+    def isochrone(self, request):
+        mode = request.query_params.get('mode', 'walk')
+        try:
+            origin = (float(request.query_params['lat']),
+                      float(request.query_params['lon']))
+            minutes = int(request.query_params['minutes'])
+        except (KeyError, ValueError):
+            return Response(
+                data={'errors': 'Укажите координаты lat, lon и minutes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (mode not in settings.ROUTING_SPEEDS
+                or not 0 < minutes <= settings.ROUTING_MAX_TRAVEL_TIME):
+            return Response(
+                data={'errors': 'Некорректные mode или minutes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            region = get_isochrone(origin, mode, minutes * 60)
+        except GraphUnavailable:
+            return Response(
+                data={'errors': 'Построение маршрутов недоступно'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        events = self.filter_queryset(self.get_queryset()).filter(
+            location__point__within=region
+        )
+        page = self.paginate_queryset(events)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(methods=['GET'],
             detail=True,
             permission_classes=[permissions.IsAuthenticated,])
     def eventroute(self, request, **kwargs):
-        event = get_object_or_404(Event, id=self.kwargs['pk'])
-# При тестировании проекта находим ipчерез локальный домен по библиотеке socket
-# При деплое меняем на получениу ip через функцию get_client_ip
-        hostname = socket.gethostname()
-        local_ip = socket.gethostbyname(hostname)
-        return Response(f'Здесь будет маршрут, {local_ip}')
+        event = get_object_or_404(
+            Event.objects.select_related('location'), id=self.kwargs['pk']
+        )
+        mode = request.query_params.get('mode', 'walk')
+        try:
+            origin = (float(request.query_params['lat']),
+                      float(request.query_params['lon']))
+        except (KeyError, ValueError):
+            return Response(
+                data={'errors': 'Укажите координаты lat и lon'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if mode not in settings.ROUTING_SPEEDS:
+            return Response(
+                data={'errors': 'Неизвестный способ передвижения'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        point = event.location.point
+        if point is None:
+            return Response(
+                data={'errors': 'Место проведения еще не определено'},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            route = build_route(origin, (point.y, point.x), mode)
+        except GraphUnavailable:
+            return Response(
+                data={'errors': 'Построение маршрутов недоступно'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        except NoRoute:
+            return Response(
+                data={'errors': 'Маршрут не найден'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(route)
 
 
 class CommentViewSet(viewsets.ModelViewSet):
     """Сериализатор для комментариев к постам."""
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = CustomPaginator
+    pagination_class = CommentPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = CommentFilter
 
     def get_queryset(self):
         post = get_object_or_404(Event, id=self.kwargs['event_id'])
-        return post.comments.all()
+        return post.comments.select_related(
+            'author'
+        ).with_user_data(self.request.user)
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -117,6 +320,31 @@ class CommentViewSet(viewsets.ModelViewSet):
             self.permission_classes = [permissions.IsAuthenticated]
         return super().get_permissions()
 
+    def list(self, request, *args, **kwargs):
+        # Изменения комментариев и лайков повышают версию мероприятия
+        # и его last_modified (триггер touch_event)
+        return conditional_response(
+            request,
+            lambda: super(CommentViewSet, self).list(
+                request, *args, **kwargs
+            ),
+            versions=get_versions(kwargs['event_id']) + [
+                get_last_modified(Event.objects.all(),
+                                  pk=kwargs['event_id'])
+            ]
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            lambda: super(CommentViewSet, self).retrieve(
+                request, *args, **kwargs
+            ),
+            last_modified=get_last_modified(Comment.objects.all(),
+                                            pk=kwargs['pk'],
+                                            event_id=kwargs['event_id'])
+        )
+
     def perform_create(self, serializer):
         event = get_object_or_404(Event, id=self.kwargs['event_id'])
         serializer.save(author=self.request.user, event=event)
@@ -125,24 +353,18 @@ class CommentViewSet(viewsets.ModelViewSet):
             detail=True,
             permission_classes=(permissions.IsAuthenticated,))
     def like(self, request, event_id, pk):
-        event = get_object_or_404(Event, id=event_id)
-        comment = event.comments.get(id=pk)
-        like = Like.objects.filter(user=request.user, comment=comment)
-
         if request.method == 'POST':
-            if like.exists():
-                return Response('Вы уже оценили этот комментарий.',
-                                status=status.HTTP_400_BAD_REQUEST)
-            Like.objects.create(user=request.user, comment=comment)
-            serializer = CommentSerializer(comment,
-                                           context={'request': request})
-
-            return Response(data=serializer.data,
-                            status=status.HTTP_201_CREATED)
-
-        if not like.exists():
-            return Response('Вы еще не оценили этот комментарий.',
-                            status=status.HTTP_400_BAD_REQUEST)
-        like.delete()
-        return Response(data=self.get_serializer(comment).data,
-                        status=status.HTTP_204_NO_CONTENT)
+            return create_relation(request,
+                                   Comment,
+                                   Like,
+                                   pk,
+                                   'comment',
+                                   counter='likes_count',
+                                   event_id=event_id)
+        return delete_relation(request,
+                               Comment,
+                               Like,
+                               pk,
+                               'comment',
+                               counter='likes_count',
+                               event_id=event_id)
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+SUBSCRIBE_TRIGGER = '''
+CREATE TRIGGER subscribe_count
+AFTER INSERT OR DELETE ON users_subscribe
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('users_customuser', 'subscribers_count', 'author_id');
+'''
+
+FILL_SUBSCRIBERS_COUNT = '''
+UPDATE users_customuser SET subscribers_count = (
+    SELECT COUNT(*) FROM users_subscribe
+    WHERE users_subscribe.author_id = users_customuser.id
+);
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0001_initial"),
+        ("events", "0009_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="subscribers_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество подписчиков",
+            ),
+        ),
+        migrations.RunSQL(
+            SUBSCRIBE_TRIGGER,
+            "DROP TRIGGER IF EXISTS subscribe_count ON users_subscribe;",
+        ),
+        migrations.RunSQL(FILL_SUBSCRIBERS_COUNT, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:00
+
+from django.db import migrations
+
+SUBSCRIBE_TRIGGER = '''
+DROP TRIGGER IF EXISTS subscribe_count ON users_subscribe;
+CREATE TRIGGER subscribe_count
+AFTER INSERT OR DELETE OR UPDATE OF author_id ON users_subscribe
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('users_customuser', 'subscribers_count', 'author_id');
+'''
+
+OLD_SUBSCRIBE_TRIGGER = '''
+DROP TRIGGER IF EXISTS subscribe_count ON users_subscribe;
+CREATE TRIGGER subscribe_count
+AFTER INSERT OR DELETE ON users_subscribe
+FOR EACH ROW EXECUTE FUNCTION
+    adjust_counter('users_customuser', 'subscribers_count', 'author_id');
+'''
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0002_customuser_subscribers_count"),
+        ("events", "0014_counter_updates"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SUBSCRIBE_TRIGGER, OLD_SUBSCRIBE_TRIGGER),
+    ]
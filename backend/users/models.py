@@ -5,11 +5,14 @@ from django.utils.translation import gettext_lazy as _
 
 from phonenumber_field.modelfields import PhoneNumberField
 
+from events.counters import CounterFieldsMixin
 from events.models import Activity
 
 
-class CustomUser(AbstractUser):
+class CustomUser(CounterFieldsMixin, AbstractUser):
     """Кастомная модель пользователя."""
+    counter_fields = ('subscribers_count',)
+
     username = models.CharField(
         'Логин',
         max_length=150,
@@ -46,6 +49,11 @@ class CustomUser(AbstractUser):
         through='FavoriteActivity',
         related_name='user_activities'
     )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'password']
@@ -63,7 +63,7 @@ class RegisterUserSerializer(UserCreateSerializer):
 class CustomUserSerializer(UserSerializer):
     """Кастомный сериализатор пользователей."""
     age = serializers.SerializerMethodField()
-    subscribers_count = serializers.SerializerMethodField()
+    subscribers_count = serializers.IntegerField(read_only=True)
     is_subscribed = serializers.SerializerMethodField()
     birth_year = serializers.IntegerField(write_only=True)
     photo = Base64ImageField()
@@ -104,9 +104,6 @@ class CustomUserSerializer(UserSerializer):
             return False
         return user.subscriptions.filter(author=author).exists()
 
-    def get_subscribers_count(self, user):
-        return user.subscribers.all().count()
-
     @transaction.atomic
     def update(self, instance, validated_data):
         activity = validated_data.pop('activities')
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Массовое изменение связей пользователя (bulk_relation), для которого
+# post_save/post_delete не отправляются. Аргументы: user, pk_set - id
+# объектов, связи с которыми созданы или удалены.
+relations_changed = Signal()
@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from rest_framework.test import APIClient
+
+from .models import CustomUser, Subscribe
+
+
+def create_user(index):
+    return CustomUser.objects.create(
+        username=f'user_{index}',
+        email=f'user_{index}@example.com',
+        first_name='Имя',
+        last_name='Фамилия',
+        phone_number=f'+7900{index:07d}'
+    )
+
+
+class SubscribeTest(TestCase):
+    """Подписка на автора одним запросом INSERT/DELETE."""
+
+    def setUp(self):
+        self.author = create_user(1)
+        self.user = create_user(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_subscribe_and_unsubscribe(self):
+        path = f'/api/users/{self.author.pk}/subscribe/'
+        response = self.client.post(path)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['subscribers_count'], 1)
+        self.assertEqual(self.client.post(path).status_code, 400)
+        self.assertEqual(self.client.delete(path).status_code, 204)
+        self.assertEqual(self.client.delete(path).status_code, 404)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 0)
+
+    def test_self_subscription(self):
+        for user_id in (str(self.user.pk), f'0{self.user.pk}'):
+            response = self.client.post(f'/api/users/{user_id}/subscribe/')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscribe.objects.exists())
+
+    def test_missing_author(self):
+        for user_id in (self.author.pk + 1000, 'abc'):
+            response = self.client.post(f'/api/users/{user_id}/subscribe/')
+            self.assertEqual(response.status_code, 404)
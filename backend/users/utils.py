@@ -1,41 +1,193 @@
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
+from django.db import connection, router
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
 
 from rest_framework import status
 from rest_framework.response import Response
 
+from .signals import relations_changed
 
-def create_relation(request, model, model_relation, pk, serializer, field):
-    """Функция создания связи User - Model."""
-
-    model_obj = get_object_or_404(model, pk=pk)
-    model_relation_obj = model_relation.objects.filter(
-        user=request.user, **{field: model_obj}
+# Вставка или удаление связи одним запросом вместе с проверкой
+# существования объекта и текущим значением его счетчика.
+# Изменение связи не видно в CTE parent, поэтому счетчик
+# корректируется на количество измененных строк в Python.
+RELATION_INSERT_SQL = '''
+    WITH parent AS ({parent}),
+    changed AS (
+        INSERT INTO {relation} (user_id, {column})
+        SELECT %s, parent.id FROM parent
+        ON CONFLICT DO NOTHING
+        RETURNING id
     )
+    SELECT (SELECT COUNT(*) FROM parent),
+           ARRAY(SELECT id FROM changed),
+           {counter}
+'''
 
-    if not model_relation_obj.exists():
-        model_relation.objects.create(user=request.user,
-                                      **{field: model_obj})
-        serializer = serializer(model_obj, context={'request': request})
-        return Response(serializer.data,
-                        status=status.HTTP_201_CREATED)
-    return Response(
-        data={'errors': 'Попытка повторного добавления объекта'},
-        status=status.HTTP_400_BAD_REQUEST
+RELATION_DELETE_SQL = '''
+    WITH parent AS ({parent}),
+    changed AS (
+        DELETE FROM {relation}
+        WHERE user_id = %s AND {column} IN (SELECT id FROM parent)
+        RETURNING id
     )
+    SELECT (SELECT COUNT(*) FROM parent),
+           ARRAY(SELECT id FROM changed),
+           {counter}
+'''
+
+RELATION_BULK_DELETE_SQL = '''
+    DELETE FROM {relation} WHERE user_id = %s AND {column} = ANY(%s)
+'''
 
 
-def delete_relation(request, model, model_relation, pk, field):
-    """Функция удаления связи User - Model."""
+def toggle_relation(sql, user, model, model_relation, pk, field,
+                    counter=None, **filters):
+    """Выполняет RELATION_INSERT_SQL или RELATION_DELETE_SQL.
 
-    model_obj = get_object_or_404(model, pk=pk)
-    model_relation_obj = model_relation.objects.filter(
-        user=request.user, **{field: model_obj}
+    Возвращает (объект найден, id измененных связей, значение счетчика
+    объекта до изменения или None)."""
+    columns = ['pk'] + ([counter] if counter else [])
+    try:
+        parent = model.objects.filter(
+            pk=pk, **filters
+        ).order_by().values(*columns)
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+    parent_sql, params = parent.query.sql_with_params()
+    quote = connection.ops.quote_name
+    query = sql.format(
+        parent=parent_sql,
+        relation=quote(model_relation._meta.db_table),
+        column=quote(model_relation._meta.get_field(field).column),
+        counter=(f'(SELECT {quote(counter)} FROM parent)'
+                 if counter else 'NULL')
     )
+    with connection.cursor() as cursor:
+        cursor.execute(query, [*params, user.pk])
+        found, changed, value = cursor.fetchone()
+    return bool(found), changed, value
+
+
+def send_relation_signals(signal, user, model_relation, pk, field, changed):
+    """Отправляет post_save/post_delete для измененных связей,
+    чтобы сработали обработчики рекомендаций и кеша."""
+    using = router.db_for_write(model_relation)
+    for relation_id in changed:
+        instance = model_relation(
+            id=relation_id,
+            user_id=user.pk,
+            **{model_relation._meta.get_field(field).attname: int(pk)}
+        )
+        if signal is post_save:
+            signal.send(sender=model_relation, instance=instance,
+                        created=True, update_fields=None, raw=False,
+                        using=using)
+        else:
+            signal.send(sender=model_relation, instance=instance,
+                        using=using, origin=instance)
 
-    if model_relation_obj.exists():
-        model_relation_obj.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+
+def relation_data(field, pk, counter, value):
+    data = {field: int(pk)}
+    if counter:
+        data[counter] = value
+    return data
+
+
+def create_relation(request, model, model_relation, pk, field,
+                    counter=None, **filters):
+    """Функция создания связи User - Model.
+
+    Связь создается одним запросом INSERT ... ON CONFLICT DO NOTHING,
+    поэтому параллельные повторы не приводят к ошибке уникальности.
+    В ответе - id объекта и новое значение счетчика `counter`."""
+    found, changed, value = toggle_relation(
+        RELATION_INSERT_SQL, request.user, model, model_relation, pk,
+        field, counter, **filters
+    )
+    if not found:
+        raise Http404
+    if not changed:
+        return Response(
+            data={'errors': 'Попытка повторного добавления объекта'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    send_relation_signals(post_save, request.user, model_relation, pk,
+                          field, changed)
     return Response(
-        data={'errors': 'Попытка удаления несуществующего объекта'},
-        status=status.HTTP_404_NOT_FOUND
+        relation_data(field, pk, counter,
+                      value + len(changed) if counter else None),
+        status=status.HTTP_201_CREATED
     )
+
+
+def delete_relation(request, model, model_relation, pk, field,
+                    counter=None, **filters):
+    """Функция удаления связи User - Model одним запросом
+    DELETE ... RETURNING."""
+    found, changed, _ = toggle_relation(
+        RELATION_DELETE_SQL, request.user, model, model_relation, pk,
+        field, counter, **filters
+    )
+    if not found or not changed:
+        return Response(
+            data={'errors': 'Попытка удаления несуществующего объекта'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    send_relation_signals(post_delete, request.user, model_relation, pk,
+                          field, changed)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def bulk_relation(user, model, model_relation, ids, field, add):
+    """Создает (add=True) или удаляет связи пользователя с объектами
+    `ids` одним bulk_create(ignore_conflicts=True) или одним DELETE.
+
+    Возвращает список {'id', 'status'} в порядке `ids`."""
+    ids = list(dict.fromkeys(ids))
+    found = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    relations = model_relation.objects.filter(
+        user=user, **{f'{field}__in': found}
+    )
+    related = set(relations.values_list(f'{field}_id', flat=True))
+
+    if add:
+        changed = [pk for pk in ids if pk in found and pk not in related]
+        model_relation.objects.bulk_create(
+            [model_relation(user=user, **{f'{field}_id': pk})
+             for pk in changed],
+            ignore_conflicts=True
+        )
+        unchanged_status, changed_status = 'exists', 'added'
+    else:
+        changed = [pk for pk in ids if pk in related]
+        if changed:
+            # Один DELETE без выборки строк для post_delete:
+            # обработчики получают relations_changed
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    RELATION_BULK_DELETE_SQL.format(
+                        relation=quote(model_relation._meta.db_table),
+                        column=quote(
+                            model_relation._meta.get_field(field).column
+                        )
+                    ),
+                    [user.pk, changed]
+                )
+        unchanged_status, changed_status = 'absent', 'removed'
+
+    if changed:
+        relations_changed.send(sender=model_relation,
+                               user=user,
+                               pk_set=set(changed))
+    changed = set(changed)
+    return [
+        {'id': pk,
+         'status': ('not_found' if pk not in found
+                    else changed_status if pk in changed
+                    else unchanged_status)}
+        for pk in ids
+    ]
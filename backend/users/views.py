@@ -1,4 +1,5 @@
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import Http404
 
 from djoser.views import UserViewSet
 
@@ -14,7 +15,7 @@ from .utils import create_relation, delete_relation
 
 from .permissions import IsAdminAuthorOrReadOnly
 
-from events.models import Activity, Event
+from events.recommendations import get_recommended_events
 from events.serializers import EventSerializer
 
 
@@ -35,20 +36,24 @@ class CustomUserViewSet(UserViewSet):
             detail=True,
             permission_classes=[permissions.IsAuthenticated, ])
     def subscribe(self, request, id):
-        author = get_object_or_404(CustomUser, pk=id)
-        if request.user != author:
+        try:
+            author_id = int(id)
+        except ValueError:
+            raise Http404
+        if request.user.pk != author_id:
             if request.method == 'POST':
                 return create_relation(request,
                                        CustomUser,
                                        Subscribe,
                                        id,
-                                       CustomUserSerializer,
-                                       field='author')
+                                       field='author',
+                                       counter='subscribers_count')
             return delete_relation(request,
                                    CustomUser,
                                    Subscribe,
                                    id,
-                                   field='author')
+                                   field='author',
+                                   counter='subscribers_count')
         return Response(
             data={'errors': 'Подписка на самого себя запрещена'},
             status=status.HTTP_400_BAD_REQUEST
@@ -71,18 +76,14 @@ class CustomUserViewSet(UserViewSet):
             detail=False,
             permission_classes=[permissions.IsAuthenticated, ])
     def recommendations(self, request):
-        user_activity_data = Activity.objects.filter(
-            users_for_activity__user=request.user
-        )
-        events_data = Event.objects.all()
-        recommendation_events = []
-
-        for event in events_data:
-            for activity in user_activity_data.values():
-                if activity in event.activity.values():
-                    recommendation_events.append(event)
+        recommendation_events = get_recommended_events(
+            request.user
+        ).with_related().with_user_data(
+            request.user
+        ).with_comments_preview(request.user, settings.COMMENTS_PREVIEW_SIZE)
+        page = self.paginate_queryset(recommendation_events)
         serializer = EventSerializer(
-            recommendation_events, many=True, context={'request': request}
+            page, many=True, context={'request': request}
         )
 
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)